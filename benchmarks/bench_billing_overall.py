@@ -0,0 +1,113 @@
+"""
+Benchmark for the billing dashboards (get_overall_billing, get_overall_billing_by_company)
+
+Seeds a scratch database with daily billing rows (by default 1,000 companies over 3
+years, about 1.1M documents), then times the previous implementation (a paged
+aggregation plus a distinct() for the count) against the current single $facet
+aggregation for a few typical dashboard queries. Only the current one returns true
+grand totals; the previous one summed the page.
+
+Usage:
+    python -m benchmarks.bench_billing_overall --companies 1000 --days 1095 --repeat 5
+"""
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from src.db.db_factory.mongo.billing_periods import period_title
+from src.db.db_factory.mongo.indexes import ensure_indexes
+from src.db.db_factory.mongo.mongo import MongoDB
+
+
+def seed(mongo: MongoDB, companies: int, days: int, batch_size: int = 10000) -> None:
+    billing = mongo.db["billing"]
+    first_day = datetime(2022, 1, 1)
+    batch = []
+    started = time.perf_counter()
+    for day in range(days):
+        date = first_day + timedelta(days=day)
+        for company in range(companies):
+            input_token = (company * 7 + day * 13) % 5000
+            output_token = (company * 11 + day * 3) % 2000
+            batch.append({
+                "frequency": "daily",
+                "date": period_title("daily", date),
+                "period": date,
+                "company_id": str(company),
+                "input_token": input_token,
+                "output_token": output_token,
+                "cost": (input_token * 0.0182 + output_token * 0.0727) / 1000,
+            })
+            if len(batch) >= batch_size:
+                billing.insert_many(batch, ordered=False)
+                batch = []
+    if batch:
+        billing.insert_many(batch, ordered=False)
+    ensure_indexes(mongo.db)
+    print(f"Seeded {companies * days} billing rows in {time.perf_counter() - started:.1f}s")
+
+
+def legacy_overall(mongo: MongoDB, match_query: dict, group_id: str, distinct_field: str, sort: dict, page_size: int = 10) -> None:
+    billing = mongo.db["billing"]
+    list(billing.aggregate([
+        {"$match": match_query},
+        {"$group": {"_id": group_id, "total_cost": {"$sum": "$cost"}, "total_input_tokens": {"$sum": "$input_token"}, "total_output_tokens": {"$sum": "$output_token"}}},
+        {"$sort": sort},
+        {"$skip": 0},
+        {"$limit": page_size},
+    ]))
+    len(billing.distinct(distinct_field, match_query))
+
+
+def timed(function, repeat: int) -> list:
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the billing dashboard aggregations")
+    parser.add_argument("--companies", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db-name", default=f"bench_billing_{uuid.uuid4().hex[:8]}")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database")
+    args = parser.parse_args()
+
+    mongo = MongoDB(db_name=args.db_name)
+    mongo.connect()
+    try:
+        seed(mongo, args.companies, args.days)
+        last_day = datetime(2022, 1, 1) + timedelta(days=args.days - 1)
+        last_30 = (last_day - timedelta(days=29)).strftime("%d-%m-%Y")
+        last_365 = (last_day - timedelta(days=364)).strftime("%d-%m-%Y")
+
+        cases = [
+            ("overall, all days", lambda: mongo.get_overall_billing(frequency="daily"),
+             lambda: legacy_overall(mongo, {"frequency": "daily"}, "$period", "period", {"_id": 1})),
+            ("overall, last 30 days", lambda: mongo.get_overall_billing(date_from=last_30, frequency="daily"),
+             lambda: legacy_overall(mongo, {"frequency": "daily", "period": {"$gte": last_day - timedelta(days=29)}}, "$period", "period", {"_id": 1})),
+            ("by company, all days", lambda: mongo.get_overall_billing_by_company(frequency="daily"),
+             lambda: legacy_overall(mongo, {"frequency": "daily", "company_id": {"$ne": ""}}, "$company_id", "company_id", {"total_cost": -1})),
+            ("by company, last year", lambda: mongo.get_overall_billing_by_company(date_from=last_365, frequency="daily"),
+             lambda: legacy_overall(mongo, {"frequency": "daily", "company_id": {"$ne": ""}, "period": {"$gte": last_day - timedelta(days=364)}}, "$company_id", "company_id", {"total_cost": -1})),
+        ]
+
+        print(f"{'query':<24} {'legacy (2 round trips)':>24} {'$facet (1 round trip)':>24}")
+        for name, current, legacy in cases:
+            legacy_times = timed(legacy, args.repeat)
+            current_times = timed(current, args.repeat)
+            print(f"{name:<24} {statistics.median(legacy_times) * 1000:>21.1f} ms {statistics.median(current_times) * 1000:>21.1f} ms")
+    finally:
+        if not args.keep:
+            mongo.client.drop_database(args.db_name)
+        mongo.disconnect()
+
+
+if __name__ == "__main__":
+    main()
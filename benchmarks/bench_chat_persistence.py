@@ -0,0 +1,117 @@
+"""
+Benchmark for persisting one chat turn (MongoDB.post_two_chats)
+
+Writes the same chat pairs with the previous sequence of commands (find_one on the
+conversation, update_one or find_one + insert_one, insert_many, then three billing
+upserts) and with the current post_two_chats (conversation upsert, insert_many and
+one billing bulk_write), and reports the round trips and wall time per turn.
+Runs against a scratch database which is dropped afterwards.
+
+Usage:
+    python -m benchmarks.bench_chat_persistence --turns 500 [--transactional]
+"""
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+from pymongo import monitoring
+
+from src.db.db_factory.mongo.mongo import MongoDB
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def legacy_post_two_chats(mongo: MongoDB, conversation_id: str, user_id: str, question: str, answer: str) -> None:
+    """The command sequence post_two_chats used to send"""
+    conversations = mongo.db["conversations"]
+    now = mongo._get_current_timestamp()
+    if not conversations.find_one({"id": conversation_id}):
+        if not conversations.find_one({"id": conversation_id}):
+            conversations.insert_one(mongo._new_conversation(conversation_id, question, user_id, now))
+    else:
+        conversations.update_one({"id": conversation_id}, {"$set": {"updated_at": now}})
+    mongo.db["chats"].insert_many([
+        {"message_id": user_id + now + "usr", "conversation_id": conversation_id, "role": "user", "message": question, "created_at": now},
+        {"message_id": user_id + now + "ai", "conversation_id": conversation_id, "role": "assistant", "message": answer, "created_at": now},
+    ])
+    date_obj = datetime.fromisoformat(now.rstrip("Z"))
+    for frequency, period in (("daily", date_obj.strftime("%d-%m-%Y")), ("monthly", date_obj.strftime("%m-%Y")), ("yearly", date_obj.strftime("%Y"))):
+        mongo.db["billing"].update_one(
+            {"frequency": frequency, "date": period, "company_id": conversation_id.split("_")[0]},
+            {"$inc": {"input_token": 100, "output_token": 200, "cost": 0.0}},
+            upsert=True,
+        )
+
+
+def current_post_two_chats(mongo: MongoDB, conversation_id: str, user_id: str, question: str, answer: str) -> None:
+    now = mongo._get_current_timestamp()
+    mongo.post_two_chats(
+        conversation_id=conversation_id,
+        first_user_id=user_id,
+        first_msg_id=user_id + now + "usr",
+        first_role="user",
+        first_message=question,
+        first_msg_summary=question,
+        second_user_id=user_id,
+        second_msg_id=user_id + now + "ai",
+        second_role="assistant",
+        second_message=answer,
+        second_msg_summary=answer,
+        input_token=100,
+        output_token=200,
+    )
+
+
+def run(name: str, write, mongo: MongoDB, counter: CommandCounter, turns: int) -> None:
+    conversation_ids = [f"bench_{uuid.uuid4().hex}" for _ in range(max(turns // 5, 1))]
+    latencies = []
+    counter.count = 0
+    for turn in range(turns):
+        started = time.perf_counter()
+        write(mongo, conversation_ids[turn % len(conversation_ids)], "bench_user", "What is the leave policy?", "You get 20 days.")
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(
+        f"{name:<12} round trips/turn={counter.count / turns:5.2f}  "
+        f"mean={statistics.mean(latencies) * 1000:7.2f}ms  "
+        f"p50={statistics.median(latencies) * 1000:7.2f}ms  "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:7.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark chat pair persistence")
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--db-name", default=f"bench_chat_persistence_{uuid.uuid4().hex[:8]}")
+    parser.add_argument("--transactional", action="store_true", help="write the pair in a transaction (needs a replica set)")
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    monitoring.register(counter)
+
+    mongo = MongoDB(db_name=args.db_name, transactional_writes=args.transactional)
+    mongo.connect()
+    try:
+        run("legacy", legacy_post_two_chats, mongo, counter, args.turns)
+        run("bulk" if not args.transactional else "transaction", current_post_two_chats, mongo, counter, args.turns)
+    finally:
+        mongo.client.drop_database(args.db_name)
+        mongo.disconnect()
+
+
+if __name__ == "__main__":
+    main()
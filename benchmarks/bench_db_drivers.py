@@ -0,0 +1,138 @@
+"""
+Concurrency benchmark of the two DBInterface implementations (MONGO_DRIVER)
+
+Seeds a scratch database with conversations, chats, feedbacks and billing, then runs
+a mix of the calls the API makes (conversation list, chat page, feedback stats,
+billing dashboard and, with --writes, chat pair inserts) at increasing concurrency
+levels through `call_db`, exactly as the routes do: the pymongo implementation in
+worker threads, the motor implementation as coroutines. Reports calls per second and
+latency percentiles for each driver and level. The database is dropped afterwards.
+
+Usage:
+    python -m benchmarks.bench_db_drivers --levels 1,10,50,100 --requests 2000 [--writes]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# both drivers write billing with the chats, so the write mix is the same
+os.environ["BILLING_ACCUMULATOR_ENABLED"] = "false"
+
+from src.db.db_factory.factory import call_db
+from src.db.db_factory.mongo.indexes import ensure_indexes
+from src.db.db_factory.mongo.mongo import MongoDB
+from src.db.db_factory.mongo.motor_mongo import MotorMongoDB
+
+
+def seed(mongo: MongoDB, users: int, conversations_per_user: int, turns_per_conversation: int) -> list:
+    """Chat turns through post_chat_pairs and a feedback on every tenth answer, returns the conversation ids"""
+    started = time.perf_counter()
+    first = datetime(2025, 1, 1)
+    conversation_ids = []
+    for user in range(users):
+        turns = []
+        for conversation in range(conversations_per_user):
+            conversation_id = f"{user % 20}_{user}_{conversation}"
+            conversation_ids.append(conversation_id)
+            for turn in range(turns_per_conversation):
+                timestamp = (first + timedelta(minutes=conversation * 60 + turn)).isoformat() + "Z"
+                turns.append({
+                    "conversation_id": conversation_id,
+                    "user_id": f"user{user}",
+                    "question": f"question {turn}",
+                    "answer": f"answer {turn} " * 20,
+                    "user_message_id": f"{conversation_id}_{turn}usr",
+                    "ai_message_id": f"{conversation_id}_{turn}ai",
+                    "timestamp": timestamp,
+                    "input_token": 500,
+                    "output_token": 150,
+                })
+        mongo.post_chat_pairs(turns)
+    for conversation_id in conversation_ids[::10]:
+        mongo.post_feedback(f"{conversation_id}_0ai", is_like=random.random() < 0.7)
+    ensure_indexes(mongo.db)
+    print(f"Seeded {len(conversation_ids)} conversations in {time.perf_counter() - started:.1f}s")
+    return conversation_ids
+
+
+def calls(db, conversation_ids: list, users: int, writes: bool) -> list:
+    """The call mix, as (function, args) factories"""
+    mix = [
+        lambda: (db.get_all_conversations, (f"user{random.randrange(users)}", 1, 10)),
+        lambda: (db.get_chat_by_page, (random.choice(conversation_ids), None, 10)),
+        lambda: (db.count_feedbacks, ()),
+        lambda: (db.get_all_feedbacks, (True, 1, 10)),
+        lambda: (db.get_overall_billing, (None, None, "daily", 1, 10)),
+    ]
+    if writes:
+        def post_two_chats():
+            conversation_id = random.choice(conversation_ids)
+            message_id = uuid.uuid4().hex
+            return db.post_two_chats, (conversation_id, "bench", message_id + "usr", "user", "question", "question",
+                                       "bench", message_id + "ai", "assistant", "answer", "answer", 500, 150)
+        mix.append(post_two_chats)
+    return mix
+
+
+async def run_level(db, mix: list, concurrency: int, total: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            method, args = random.choice(mix)()
+            started = time.perf_counter()
+            await call_db(method, *args)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the pymongo and motor DBInterface implementations under concurrency")
+    parser.add_argument("--levels", default="1,10,50,100")
+    parser.add_argument("--requests", type=int, default=2000, help="calls per level and driver")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--conversations", type=int, default=10, help="conversations per user")
+    parser.add_argument("--turns", type=int, default=20, help="turns per conversation")
+    parser.add_argument("--writes", action="store_true", help="include post_two_chats in the mix")
+    parser.add_argument("--db-name", default=f"bench_drivers_{uuid.uuid4().hex[:8]}")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(",")]
+
+    sync_db = MongoDB(db_name=args.db_name)
+    sync_db.connect()
+    motor_db = MotorMongoDB(db_name=args.db_name)
+    motor_db.connect()
+    try:
+        conversation_ids = seed(sync_db, args.users, args.conversations, args.turns)
+        drivers = {"pymongo": sync_db, "motor": motor_db}
+        print(f"{'concurrency':>11} {'driver':>8} {'calls/s':>10} {'p50 ms':>8} {'p95 ms':>8}")
+        for concurrency in levels:
+            for name, db in drivers.items():
+                mix = calls(db, conversation_ids, args.users, args.writes)
+                # warm the pool up to this level
+                await run_level(db, mix, concurrency, min(args.requests, concurrency * 2))
+                result = await run_level(db, mix, concurrency, args.requests)
+                print(f"{concurrency:>11} {name:>8} {result['rps']:>10.0f} {result['p50']:>8.1f} {result['p95']:>8.1f}")
+    finally:
+        sync_db.client.drop_database(args.db_name)
+        motor_db.disconnect()
+        sync_db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
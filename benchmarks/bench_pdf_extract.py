@@ -0,0 +1,112 @@
+"""
+Benchmark of PDF page extraction on the knowledge base upload path
+
+Writes text-only PDFs of 10, 100 and 500 pages (or reads --file), then times reading
+every page the way upload_pdf used to (PyPDFLoader, one page after the other), with
+extract_pages in the calling thread and with extract_pages over a spawned process
+pool of each size in --levels. With --files N it also times N documents of each size
+read one after the other and concurrently, as the upload job does. Reports seconds and
+pages per second; embedding and insertion are not part of it.
+
+Usage:
+    python -m benchmarks.bench_pdf_extract --pages 10,100,500 --levels 2,4,8 [--files 4] [--file manual.pdf]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from src.kb.pdf import extract_pages
+
+WORDS = "leave attendance payroll asset module report employee approval policy salary shift roster holiday overtime".split()
+
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 45) -> None:
+    """A PDF of `pages` pages of made up text in Helvetica, written by hand so the benchmark needs no PDF writer"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        lines = [" ".join(random.choices(WORDS, k=12)) for _ in range(lines_per_page)]
+        text = b"BT /F1 10 Tf 12 TL 50 780 Td " + b" ".join(f"({line}) '".encode() for line in lines) + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(text), text))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects)))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % kid for kid in kids), pages)
+
+    with open(path, "wb") as target:
+        target.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(target.tell())
+            target.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref = target.tell()
+        target.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        target.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+        target.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def legacy(path: str) -> int:
+    from langchain_community.document_loaders import PyPDFLoader
+    return len([page.page_content for page in PyPDFLoader(path).load()])
+
+
+def timed(label: str, run, pages: int) -> None:
+    started = time.perf_counter()
+    extracted = run()
+    seconds = time.perf_counter() - started
+    assert extracted == pages, f"{label} read {extracted} of {pages} pages"
+    print(f"{label:<36} {pages:>6} pages {seconds:>8.2f}s {pages / seconds:>10.1f} pages/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF page extraction, serial PyPDFLoader against extract_pages and its process pool")
+    parser.add_argument("--pages", default="10,100,500", help="sizes of the generated documents")
+    parser.add_argument("--levels", default="2,4,8", help="process pool sizes")
+    parser.add_argument("--files", type=int, default=0, help="also read this many documents of each size concurrently")
+    parser.add_argument("--file", default=None, help="a real PDF instead of generated ones")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(",")]
+    directory = tempfile.mkdtemp()
+    documents = []
+    if args.file:
+        documents.append(args.file)
+    else:
+        for pages in [int(size) for size in args.pages.split(",")]:
+            path = os.path.join(directory, f"bench_{pages}.pdf")
+            write_pdf(path, pages)
+            documents.append(path)
+
+    pools = {level: ProcessPoolExecutor(max_workers=level, mp_context=multiprocessing.get_context("spawn")) for level in levels}
+    try:
+        for level, pool in pools.items():
+            # spawn the processes before timing anything
+            list(pool.map(abs, range(level * 2)))
+        for path in documents:
+            pages = len(extract_pages(path, processes=1))
+            try:
+                timed("PyPDFLoader, serial (before)", lambda: legacy(path), pages)
+            except ImportError:
+                print("langchain_community is not installed, skipping PyPDFLoader")
+            timed("extract_pages, calling thread", lambda: len(extract_pages(path, processes=1)), pages)
+            for level, pool in pools.items():
+                # below KB_PDF_PARALLEL_MIN_PAGES this is the calling thread again
+                timed(f"extract_pages, {level} processes", lambda: len(extract_pages(path, executor=pool, processes=level)), pages)
+            if args.files:
+                copies = [path] * args.files
+                timed(f"{args.files} files one after the other", lambda: sum(len(extract_pages(copy, processes=1)) for copy in copies), pages * args.files)
+                for level, pool in pools.items():
+                    with ThreadPoolExecutor(max_workers=args.files) as threads:
+                        timed(f"{args.files} files concurrently, {level} processes",
+                              lambda: sum(threads.map(lambda copy: len(extract_pages(copy, executor=pool, processes=level)), copies)), pages * args.files)
+            print()
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+        for path in documents:
+            if path.startswith(directory):
+                os.remove(path)
+        os.rmdir(directory)
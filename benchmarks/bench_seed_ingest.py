@@ -0,0 +1,113 @@
+"""
+Throughput benchmark of knowledge base seeding (rows per second)
+
+Streams a csv (kb/PIHR_DATASET.csv repeated, or a synthetic one with --rows) into a
+scratch collection, first the way populate_collection used to (one dynamic batch
+printing every row), then through ingest_objects at each batch size and concurrency
+level. The scratch collection has no vectorizer unless --vectorize is given, so the
+numbers measure weaviate and the pipeline rather than the embedding API. The
+collection is recreated for every run and dropped afterwards.
+
+Usage:
+    python -m benchmarks.bench_seed_ingest --rows 20000 --batch-sizes 100,200,500 --levels 1,2,4 [--vectorize]
+"""
+import argparse
+import contextlib
+import csv
+import os
+import random
+import tempfile
+import time
+
+import weaviate.classes as wvc
+
+from src.rag.rag_factory.weviate.pool import create_client
+from src.rag.rag_factory.weviate.seed.dbOps.create_collection import pihr_schema
+from src.rag.rag_factory.weviate.seed.dbOps.csv_poplator import iter_data_rows
+from src.rag.rag_factory.weviate.seed.dbOps.ingest import ingest_objects
+from src.rag.rag_factory.weviate.seed.dbOps.row_hash import seed_object
+
+SCRATCH = "BenchSeedIngest"
+WORDS = "leave attendance payroll asset module report employee approval policy salary shift roster".split()
+
+
+def write_csv(path: str, rows: int, source: str = None) -> None:
+    """`rows` rows copied from `source` with a counter appended, or made up words without one"""
+    originals = list(iter_data_rows(source)) if source else []
+    with open(path, "w", newline="", encoding="utf-8") as target:
+        writer = csv.DictWriter(target, fieldnames=["document", "document_type", "tag"])
+        writer.writeheader()
+        for row in range(rows):
+            if originals:
+                original = originals[row % len(originals)]
+                document, document_type, tags = original["document"], original["document_type"], original["tag"]
+            else:
+                document, document_type, tags = " ".join(random.choices(WORDS, k=80)), random.choice(WORDS), random.sample(WORDS, 3)
+            # every row is distinct, so no two share a uuid
+            writer.writerow({"document": f"{document} ({row})", "document_type": document_type, "tag": ",".join(tags)})
+
+
+def recreate(instance, vectorize: bool) -> None:
+    if instance.collections.exists(SCRATCH):
+        instance.collections.delete(SCRATCH)
+    instance.collections.create(
+        name=SCRATCH,
+        vectorizer_config=wvc.config.Configure.Vectorizer.text2vec_openai() if vectorize else wvc.config.Configure.Vectorizer.none(),
+        properties=pihr_schema,
+    )
+
+
+def legacy_seed(instance, file_path: str) -> dict:
+    """The seed before ingest_objects: every row in memory, one dynamic batch, a print per row"""
+    data_rows = list(iter_data_rows(file_path))
+    collection = instance.collections.get(SCRATCH)
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        with collection.batch.dynamic() as batch:
+            for data_row in data_rows:
+                print(f">>>> Adding {data_row}")
+                uuid, properties = seed_object(data_row)
+                batch.add_object(properties=properties, uuid=uuid)
+    seconds = time.perf_counter() - started
+    return {"rows": len(data_rows), "failed": len(collection.batch.failed_objects), "seconds": seconds}
+
+
+def streamed_seed(file_path: str, batch_size: int, concurrency: int) -> dict:
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        report = ingest_objects(SCRATCH, (seed_object(data_row) for data_row in iter_data_rows(file_path)), batch_size=batch_size, concurrency=concurrency)
+    return {"rows": report["rows"], "failed": report["failed"], "seconds": time.perf_counter() - started}
+
+
+def show(label: str, result: dict) -> None:
+    rate = result["rows"] / result["seconds"] if result["seconds"] > 0 else 0
+    print(f"{label:<28} {result['rows']:>8} rows {result['failed']:>6} failed {result['seconds']:>8.2f}s {rate:>10.1f} rows/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seeding throughput, legacy dynamic batch against ingest_objects")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--source", default="kb/PIHR_DATASET.csv", help="csv the rows are copied from, \"\" for made up rows")
+    parser.add_argument("--batch-sizes", default="100,200,500")
+    parser.add_argument("--levels", default="1,2,4", help="ingest_objects concurrency levels")
+    parser.add_argument("--vectorize", action="store_true", help="embed with text2vec_openai, costs API calls")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    handle, file_path = tempfile.mkstemp(suffix=".csv")
+    os.close(handle)
+    write_csv(file_path, args.rows, args.source or None)
+    instance = create_client()
+    try:
+        if not args.skip_legacy:
+            recreate(instance, args.vectorize)
+            show("legacy dynamic batch", legacy_seed(instance, file_path))
+        for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+            for concurrency in [int(level) for level in args.levels.split(",")]:
+                recreate(instance, args.vectorize)
+                show(f"batch {batch_size} x {concurrency}", streamed_seed(file_path, batch_size, concurrency))
+    finally:
+        if instance.collections.exists(SCRATCH):
+            instance.collections.delete(SCRATCH)
+        instance.close()
+        os.remove(file_path)
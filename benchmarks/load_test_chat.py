@@ -0,0 +1,81 @@
+"""
+Load test for POST /api/v1/chats
+
+Fires the same question at increasing concurrency levels against a running server
+and reports throughput and latency percentiles for each level. With a blocking LLM
+client the requests per second stay flat as concurrency grows; with the async client
+they should scale until the OpenAI rate limit or the worker count is reached.
+
+Usage:
+    python -m benchmarks.load_test_chat --url http://localhost:8000 --levels 1,5,10,25,50 --requests 100
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def send_one(client: httpx.AsyncClient, url: str, question: str) -> float:
+    payload = {
+        "question": question,
+        "is_new": False,
+        "conversation_id": f"loadtest_{uuid.uuid4().hex}",
+        "user_id": "loadtest",
+    }
+    start = time.perf_counter()
+    response = await client.post(f"{url}/api/v1/chats/", json=payload)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run_level(url: str, question: str, concurrency: int, total: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        async def worker():
+            nonlocal errors
+            async with semaphore:
+                try:
+                    latencies.append(await send_one(client, url, question))
+                except Exception as e:
+                    errors += 1
+                    print(f"request failed: {e}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0,
+        "p50": statistics.median(latencies) if latencies else 0,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0,
+        "max": latencies[-1] if latencies else 0,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Concurrency load test for the chat endpoint")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--question", default="How do I apply for leave?")
+    parser.add_argument("--levels", default="1,5,10,25,50")
+    parser.add_argument("--requests", type=int, default=100, help="requests per concurrency level")
+    args = parser.parse_args()
+
+    print(f"{'concurrency':>12} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'max s':>8}")
+    for level in [int(level) for level in args.levels.split(",")]:
+        result = await run_level(args.url, args.question, level, args.requests)
+        print(f"{result['concurrency']:>12} {result['requests']:>9} {result['errors']:>7} {result['rps']:>8.2f} "
+              f"{result['p50']:>8.2f} {result['p95']:>8.2f} {result['max']:>8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
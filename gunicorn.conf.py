@@ -0,0 +1,8 @@
+import os
+
+
+def child_exit(server, worker):
+    # a recycled worker leaves its live gauge and sum files behind, /metrics would keep adding them up
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
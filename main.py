@@ -1,35 +1,81 @@
+import asyncio
+import os
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from dotenv import load_dotenv
+import time
+from functools import partial
+from fastapi import FastAPI, Request, Response
 
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from src.rag.routes import router as rag_router
+from src.rag.routes import router as rag_router, seed_job
 from src.chat.routes import router as chat_router
 from src.db.routes import router as db_router
 from src.message.routes import router as message_router
-from src.kb.routes import router as kb_router
+from src.kb.routes import router as kb_router, pdf_upload_job
+from src.kb.pdf import shutdown_pdf_pool
+from src.jobs.routes import router as jobs_router
+
+from src.rag.rag_factory.factory import create_rag_instance
+from src.db.db_factory.factory import create_db_instance, call_db
+from src.db.db_factory.mongo.indexes import ensure_indexes
+from src.db.write_behind import ChatWriteBehind
+from src.jobs.jobs import JobRunner
+from src.chat.llm_factory.openai.openai import OpenAiLLM
+from src.chat.cache.semantic_cache import SemanticCache
+from src.rag.rag_factory.embeddings.embedding_service import EmbeddingService
+from src.metrics.metrics import REQUEST_LATENCY, start_request_timings, server_timing_header, render_metrics
 
 version = "v1"
 
-app = FastAPI()
-
-# @asynccontextmanager
-# async def lifespan(app: FastAPI):
-    # setup_logging()
-    # global db_instance
-    # db_instance = MSSQLDatabaseInistance()
-    # db_instance = SQLiteDatabaseInstance()
-    # await db_instance.connect()
-    # logger = get_app_logger()    
-    # logger.info("Application started")    
-    # print("Application started")
-    # yield
-    # await db_instance.disconnect()
-    # logger.info("Application stopped")
-
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # queries are embedded in the app (with an on-disk cache) and sent to weaviate as vectors
+    embedding_service = EmbeddingService.from_env()
+    # one RAG backend per worker (pooled weaviate or the in-process index), shared by every request
+    app.state.rag_db = create_rag_instance(embedding_service=embedding_service)
+    # one MongoClient (and its connection pool) per worker, pymongo or motor (MONGO_DRIVER)
+    app.state.db = create_db_instance()
+    app.state.db.connect()
+    # the index build and the write-behind thread make blocking calls, with motor on its small pymongo client
+    blocking_db = getattr(app.state.db, "blocking", None) or app.state.db
+    load_dotenv()
+    if os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true":
+        try:
+            ensure_indexes(blocking_db.db)
+        except Exception as e:
+            print(f"Failed to ensure MongoDB indexes: {e}")
+    # only the app batches billing, and only when the unique billing index exists
+    app.state.db.start_billing_accumulator()
+    # chat turns are queued on local disk and written to MongoDB in batches
+    app.state.chat_writer = ChatWriteBehind.from_env(blocking_db)
+    if app.state.chat_writer is not None:
+        app.state.chat_writer.start()
+    # seeding and knowledge base uploads run as background jobs, a few at a time per worker
+    app.state.jobs = JobRunner.from_env({
+        "seed": partial(seed_job, app.state.rag_db),
+        "kb_upload": partial(pdf_upload_job, app.state.rag_db, blocking_db),
+    })
+    app.state.jobs.start()
+    # one async OpenAI client per worker so completions share its http pool
+    api_key = os.getenv("OPENAI_API_KEY")
+    app.state.llm = OpenAiLLM(api_key=api_key, rag_db=app.state.rag_db, semantic_cache=SemanticCache.from_env(), embedding_service=embedding_service) if api_key else None
+    print("Application started")
+    yield
+    if app.state.llm is not None:
+        await app.state.llm.close()
+    app.state.jobs.stop()
+    shutdown_pdf_pool()
+    if app.state.chat_writer is not None:
+        # flush what is still queued while MongoDB is connected
+        app.state.chat_writer.stop()
+    app.state.db.disconnect()
+    app.state.rag_db.disconnect()
+    print("Application stopped")
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -38,14 +84,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def time_request(request: Request, call_next):
+    timings = start_request_timings()
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    REQUEST_LATENCY.labels(
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=response.status_code
+    ).observe(time.perf_counter() - started)
+    if timings:
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
 # --------------------------------  ROUTES  -------------------------------- #
 
 @app.get("/")
 async def root():
     return "PiHR X AutoQuery is Running"
 
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/health")
+async def health():
+    # the weaviate check is a blocking grpc call, kept off the event loop like the mongo one
+    return {"weaviate": await asyncio.to_thread(app.state.rag_db.is_healthy), "mongodb": await call_db(app.state.db.is_healthy)}
+
 app.include_router(rag_router, prefix=f"/api/{version}/rag", tags=['rag'])
 app.include_router(db_router, prefix=f"/api/{version}/conversations", tags=['conversations'])
 app.include_router(chat_router, prefix=f"/api/{version}/chats", tags=['chat'])
 app.include_router(message_router, prefix=f"/api/{version}/messages", tags=['message'])
 app.include_router(kb_router, prefix=f"/api/{version}/kb", tags=['kb'])
+app.include_router(jobs_router, prefix=f"/api/{version}/jobs", tags=['jobs'])
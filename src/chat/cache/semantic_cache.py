@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+from src.rag.rag_factory.collection_versions import get_collection_version
+
+
+class CacheEntry(BaseModel):
+    collection: str
+    collection_version: int
+    query: str
+    answer: str
+    expires_at: float
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on the query embedding.
+
+    A lookup returns the answer of the most similar cached query when the cosine
+    similarity is above `threshold`, the entry is not older than `ttl_seconds` and the
+    collection it was answered from has not changed since. The cache holds at most
+    `max_entries` answers and evicts the least recently used one when full.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 86400, max_entries: int = 5000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        # vectors are stored normalized in a fixed size matrix, one row per slot
+        self._vectors: Optional[np.ndarray] = None
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._free: List[int] = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["SemanticCache"]:
+        """Build the cache from SEMANTIC_CACHE_* env vars, None when disabled"""
+        load_dotenv()
+        if os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() != "true":
+            return None
+        return cls(
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+            ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400")),
+            max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000")),
+        )
+
+    def lookup(self, collection: str, vector: List[float]) -> Optional[str]:
+        """Return a cached answer for a semantically equivalent query, if any"""
+        query_vector = self._normalize(vector)
+        now = time.time()
+
+        with self._lock:
+            if not self._entries or self._vectors is None:
+                self.misses += 1
+                return None
+
+            similarities = self._vectors @ query_vector
+            similarities[~self._valid] = -1.0
+
+            candidates = np.flatnonzero(similarities >= self.threshold)
+            for slot in candidates[np.argsort(-similarities[candidates])]:
+                entry = self._entries[int(slot)]
+                if entry.expires_at < now or entry.collection_version != get_collection_version(entry.collection):
+                    self._remove(int(slot))
+                    self.invalidations += 1
+                    continue
+                if entry.collection != collection:
+                    continue
+                self._entries.move_to_end(int(slot))
+                self.hits += 1
+                return entry.answer
+
+            self.misses += 1
+            return None
+
+    def store(self, collection: str, query: str, vector: List[float], answer: str) -> None:
+        """Cache the answer of a query"""
+        query_vector = self._normalize(vector)
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, query_vector.shape[0]), dtype=np.float32)
+
+            if not self._free:
+                oldest_slot = next(iter(self._entries))
+                self._remove(oldest_slot)
+                self.evictions += 1
+
+            slot = self._free.pop()
+            self._vectors[slot] = query_vector
+            self._valid[slot] = True
+            self._entries[slot] = CacheEntry(
+                collection=collection,
+                collection_version=get_collection_version(collection),
+                query=query,
+                answer=answer,
+                expires_at=time.time() + self.ttl_seconds,
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            for slot in list(self._entries.keys()):
+                self._remove(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, slot: int) -> None:
+        self._entries.pop(slot, None)
+        self._valid[slot] = False
+        self._free.append(slot)
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm > 0 else array
@@ -1,16 +1,17 @@
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Awaitable
 import google.generativeai as genai
 
 from src.chat.llm_factory.prompts.generate_conversation_title import generate_conversation_title, ConversationTitleResponse
 from src.chat.llm_factory.llm_interface import LLMInterface
-from src.chat.llm_factory.prompts.chat_prompt import get_chat_prompt, AssistantResponse
+from src.chat.llm_factory.prompts.chat_prompt import get_chat_prompt, AssistantResponse, StreamChunk
 from src.chat.llm_factory.prompts.guardrail import get_guardrail_prompt, GurdrailResponse
 
-from src.rag.rag_factory.weviate.weviate import WeviateDatabaseInistance
+from src.rag.rag_factory.rag_interface import RAGInterface
 
 class OpenAiLLM(LLMInterface):
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, rag_db: RAGInterface):
         self.api_key = api_key
+        self.rag_db = rag_db
         self.client = genai.configure(api_key=self.api_key)
 
     async def generate_response(self, query: str, user_id: str, conversation_id: str) -> tuple[str, int, int]:
@@ -18,11 +19,7 @@ class OpenAiLLM(LLMInterface):
         if len(query) > 1200:
             return "Sorry, your question is too long. Please ask a shorter question.", 0, 0
         
-        rag_instance = WeviateDatabaseInistance()
-        
-        rag_instance.connect()        
-        rag_context = rag_instance.get_top_k_chunks("PIHR_DATASET", query, 3, True, 0.25)
-        rag_instance.disconnect()
+        rag_context = self.rag_db.get_top_k_chunks("PIHR_DATASET", query, 3, True, 0.25)
         
         rag_context = "\n".join(rag_context)
         
@@ -49,6 +46,12 @@ class OpenAiLLM(LLMInterface):
         
         return response.assistant_response, input_token, output_token
     
+    async def generate_response_stream(self, query: str, user_id: str, conversation_id: str, guardrail: Awaitable[GurdrailResponse] = None) -> AsyncIterator[StreamChunk]:
+        # structured gemini output is not streamed, send the whole answer as one chunk
+        response, input_token, output_token = await self.generate_response(query, user_id, conversation_id)
+        yield StreamChunk(content=response)
+        yield StreamChunk(input_token=input_token, output_token=output_token, done=True)
+    
     async def check_validation(self, query: str) -> GurdrailResponse:
         
         prompt = get_guardrail_prompt(query)
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Awaitable
 from src.chat.llm_factory.prompts.guardrail import GurdrailResponse
+from src.chat.llm_factory.prompts.chat_prompt import StreamChunk
 
 class LLMInterface(ABC):            
     
@@ -9,6 +10,22 @@ class LLMInterface(ABC):
     async def generate_response(self, query: str, user_id: str, conversation_id: str) -> tuple[str, int, int]:
         pass
 
+    # stream the response token by token, the last chunk has done=True and the token usage
+    # guardrail: verdict of a guardrail running alongside, nothing is cached unless it is safe
+    @abstractmethod
+    def generate_response_stream(self, query: str, user_id: str, conversation_id: str, guardrail: Awaitable[GurdrailResponse] = None) -> AsyncIterator[StreamChunk]:
+        pass
+
+    # generate a response only if the guardrail marks the query as safe
+    # mode: off (no guardrail), sequential, parallel (guardrail alongside retrieval)
+    # or speculative (guardrail alongside generation, the answer is discarded if unsafe)
+    async def generate_guarded_response(self, query: str, user_id: str, conversation_id: str, mode: str = "sequential") -> tuple[str, int, int]:
+        if mode != "off":
+            validation_chk = await self.check_validation(query)
+            if not validation_chk.is_safe:
+                return validation_chk.reasoning_for_safety_or_danger, 0, 0
+        return await self.generate_response(query, user_id, conversation_id)
+
     # check if the query is valid
     @abstractmethod
     async def check_validation(self, query: str) -> GurdrailResponse:
@@ -1,55 +1,211 @@
-from typing import Dict, Any
-from openai import OpenAI
+import asyncio
+from typing import Dict, Any, AsyncIterator, Awaitable, List
+from openai import AsyncOpenAI
 
 from src.chat.llm_factory.prompts.generate_conversation_title import generate_conversation_title, ConversationTitleResponse
 from src.chat.llm_factory.llm_interface import LLMInterface
-from src.chat.llm_factory.prompts.chat_prompt import get_chat_prompt, AssistantResponse
+from src.chat.llm_factory.prompts.chat_prompt import get_chat_prompt, AssistantResponse, StreamChunk, Prompt
 from src.chat.llm_factory.prompts.guardrail import get_guardrail_prompt, GurdrailResponse
 
-from src.rag.rag_factory.weviate.weviate import WeviateDatabaseInistance
+from src.rag.rag_factory.rag_interface import RAGInterface
+from src.chat.cache.semantic_cache import SemanticCache
+from src.rag.rag_factory.embeddings.embedding_service import EmbeddingService
+from src.metrics.metrics import timed_stage, observe_stage
+import time
+
+TOO_LONG_RESPONSE = "Sorry, your question is too long. Please ask a shorter question."
+RAG_COLLECTION = "PIHR_DATASET"
 
 class OpenAiLLM(LLMInterface):
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, rag_db: RAGInterface, semantic_cache: SemanticCache = None, embedding_service: EmbeddingService = None):
         self.api_key = api_key
-        self.client = OpenAI(api_key=self.api_key)
+        self.rag_db = rag_db
+        self.semantic_cache = semantic_cache
+        self.embedding_service = embedding_service
+        self.client = AsyncOpenAI(api_key=self.api_key)
 
     async def generate_response(self, query: str, user_id: str, conversation_id: str) -> tuple[str, int, int]:
         
         if len(query) > 1200:
-            return "Sorry, your question is too long. Please ask a shorter question.", 0, 0
+            return TOO_LONG_RESPONSE, 0, 0
         
-        rag_instance = WeviateDatabaseInistance()
+        query_vector, cached_answer, prompt = await self._prepare(query)
+        if cached_answer is not None:
+            return cached_answer, 0, 0
         
-        rag_instance.connect()        
-        rag_context = rag_instance.get_top_k_chunks("PIHR_DATASET", query, 3, True, 0.25)
-        rag_instance.disconnect()
+        assistant_response, input_token, output_token = await self._complete(prompt)
         
-        rag_context = "\n".join(rag_context)
+        if assistant_response is None:
+            return "Sorry, I could not find an answer to your question.", 0, 0
         
-        prompt = get_chat_prompt(query, rag_context)
-
-        completion = self.client.beta.chat.completions.parse(
+        self._store_cache(query, query_vector, assistant_response)
+        
+        return assistant_response, input_token, output_token
+    
+    async def generate_guarded_response(self, query: str, user_id: str, conversation_id: str, mode: str = "parallel") -> tuple[str, int, int]:
+        
+        if len(query) > 1200:
+            return TOO_LONG_RESPONSE, 0, 0
+        
+        if mode not in ("parallel", "speculative"):
+            return await super().generate_guarded_response(query, user_id, conversation_id, mode)
+        
+        guardrail = asyncio.create_task(self.check_validation(query))
+        
+        if mode == "speculative":
+            # generate while the guardrail runs, the answer is thrown away if the query is unsafe
+            generation = asyncio.create_task(self._prepare_and_complete(query))
+            try:
+                verdict = await guardrail
+            except BaseException:
+                generation.cancel()
+                raise
+            if not verdict.is_safe:
+                generation.cancel()
+                return verdict.reasoning_for_safety_or_danger, 0, 0
+            query_vector, cached_answer, (assistant_response, input_token, output_token) = await generation
+        else:
+            # embed, look up the cache and retrieve while the guardrail runs
+            try:
+                query_vector, cached_answer, prompt = await self._prepare(query)
+            except BaseException:
+                guardrail.cancel()
+                raise
+            verdict = await guardrail
+            if not verdict.is_safe:
+                return verdict.reasoning_for_safety_or_danger, 0, 0
+            assistant_response, input_token, output_token = (None, 0, 0) if cached_answer is not None else await self._complete(prompt)
+        
+        if cached_answer is not None:
+            return cached_answer, 0, 0
+        
+        if assistant_response is None:
+            return "Sorry, I could not find an answer to your question.", 0, 0
+        
+        self._store_cache(query, query_vector, assistant_response)
+        
+        return assistant_response, input_token, output_token
+    
+    async def _prepare(self, query: str) -> tuple[List[float], str, Prompt]:
+        """Embed the query and either find a cached answer or retrieve the context and build the prompt"""
+        query_vector = await self._embed_query(query)
+        cached_answer = self._lookup_cache(query_vector)
+        if cached_answer is not None:
+            return query_vector, cached_answer, None
+        
+        prompt = await self._build_prompt(query, query_vector)
+        return query_vector, None, prompt
+    
+    async def _complete(self, prompt: Prompt) -> tuple[str, int, int]:
+        with timed_stage("llm_call"):
+            completion = await self.client.beta.chat.completions.parse(
+                model="gpt-4o-mini",
+                max_tokens=400,
+                messages=[
+                    {"role": "system", "content": prompt.system_prompt},
+                    # conversation history to be added
+                    {"role": "user", "content": prompt.user_prompt},
+                ],
+                response_format= AssistantResponse
+            )
+        
+        input_token = completion.usage.prompt_tokens
+        output_token = completion.usage.completion_tokens      
+        
+        response = completion.choices[0].message.parsed
+        
+        return response.assistant_response, input_token, output_token
+    
+    async def _prepare_and_complete(self, query: str) -> tuple[List[float], str, tuple[str, int, int]]:
+        query_vector, cached_answer, prompt = await self._prepare(query)
+        if cached_answer is not None:
+            return query_vector, cached_answer, (None, 0, 0)
+        return query_vector, None, await self._complete(prompt)
+    
+    async def close(self) -> None:
+        """Release the http connection pool of the client"""
+        await self.client.close()
+    
+    async def generate_response_stream(self, query: str, user_id: str, conversation_id: str, guardrail: Awaitable[GurdrailResponse] = None) -> AsyncIterator[StreamChunk]:
+        
+        if len(query) > 1200:
+            yield StreamChunk(content=TOO_LONG_RESPONSE)
+            yield StreamChunk(done=True)
+            return
+        
+        query_vector, cached_answer, prompt = await self._prepare(query)
+        if cached_answer is not None:
+            yield StreamChunk(content=cached_answer)
+            yield StreamChunk(done=True)
+            return
+        
+        started = time.perf_counter()
+        first_token = True
+        # plain text streaming, structured outputs can only be parsed once the whole json has arrived
+        stream = await self.client.chat.completions.create(
             model="gpt-4o-mini",
             max_tokens=400,
             messages=[
                 {"role": "system", "content": prompt.system_prompt},
-                # conversation history to be added
                 {"role": "user", "content": prompt.user_prompt},
             ],
-            response_format= AssistantResponse
+            stream=True,
+            stream_options={"include_usage": True}
         )
         
-        print(completion)
+        input_token = 0
+        output_token = 0
+        answer = ""
         
-        input_token = completion.usage.prompt_tokens
-        output_token = completion.usage.completion_tokens      
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first_token:
+                    observe_stage("llm_first_token", time.perf_counter() - started)
+                    first_token = False
+                answer += chunk.choices[0].delta.content
+                yield StreamChunk(content=chunk.choices[0].delta.content)
+            if chunk.usage:
+                input_token = chunk.usage.prompt_tokens
+                output_token = chunk.usage.completion_tokens
         
-        response = completion.choices[0].message.parsed
-                        
-        if response.assistant_response is None:
-            return "Sorry, I could not find an answer to your question.", 0, 0
+        observe_stage("llm_call", time.perf_counter() - started)
         
-        return response.assistant_response, input_token, output_token
+        # the stream can end before the guardrail answers, an unsafe answer must not be served from the cache later
+        if answer and (guardrail is None or (await guardrail).is_safe):
+            self._store_cache(query, query_vector, answer)
+        
+        yield StreamChunk(input_token=input_token, output_token=output_token, done=True)
+    
+    async def _embed_query(self, query: str) -> List[float]:
+        # one embedding serves both the semantic cache and the near_vector retrieval
+        if self.embedding_service is None:
+            return None
+        try:
+            with timed_stage("embedding"):
+                return await asyncio.to_thread(self.embedding_service.embed, query)
+        except Exception as e:
+            # retrieval falls back to near_text and the cache is skipped
+            print(f"Failed to embed query: {e}")
+            return None
+    
+    def _lookup_cache(self, query_vector: List[float]) -> str:
+        if self.semantic_cache is None or query_vector is None:
+            return None
+        return self.semantic_cache.lookup(RAG_COLLECTION, query_vector)
+    
+    def _store_cache(self, query: str, query_vector: List[float], answer: str) -> None:
+        if self.semantic_cache is None or query_vector is None:
+            return
+        self.semantic_cache.store(RAG_COLLECTION, query, query_vector, answer)
+    
+    async def _build_prompt(self, query: str, query_vector: List[float] = None) -> Prompt:
+        # the weaviate client is blocking, keep it off the event loop
+        with timed_stage("retrieval"):
+            rag_context = await asyncio.to_thread(self.rag_db.get_top_k_chunks, RAG_COLLECTION, query, 3, True, 0.25, query_vector)
+        
+        with timed_stage("prompt_build"):
+            rag_context = "\n".join(rag_context)
+            return get_chat_prompt(query, rag_context)
     
     async def check_validation(self, query: str) -> GurdrailResponse:
         
@@ -57,14 +213,15 @@ class OpenAiLLM(LLMInterface):
         
         print("check validation for query: " + query)
         
-        completion = self.client.beta.chat.completions.parse(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": prompt.system_prompt},
-                {"role": "user", "content": prompt.user_prompt},
-            ],
-            response_format=GurdrailResponse
-        )
+        with timed_stage("guardrail"):
+            completion = await self.client.beta.chat.completions.parse(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": prompt.system_prompt},
+                    {"role": "user", "content": prompt.user_prompt},
+                ],
+                response_format=GurdrailResponse
+            )
         
         response = completion.choices[0].message.parsed
         
@@ -80,7 +237,7 @@ class OpenAiLLM(LLMInterface):
         
         print("Generate title for query : " + query)
         
-        completion = self.client.beta.chat.completions.parse(
+        completion = await self.client.beta.chat.completions.parse(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": prompt.system_prompt},
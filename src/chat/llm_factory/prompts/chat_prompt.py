@@ -7,6 +7,12 @@ from pydantic import BaseModel
 class AssistantResponse(BaseModel):
     assistant_response: str    
 
+class StreamChunk(BaseModel):
+    content: str = ""
+    input_token: int = 0
+    output_token: int = 0
+    done: bool = False
+
 class Prompt(BaseModel):
     system_prompt: str
     user_prompt: str    
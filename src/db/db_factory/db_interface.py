@@ -3,6 +3,11 @@ from typing import Any, Dict, List
 from src.db.schemas import ChatMessageModel, AllConversationsResponseModel, MessagesResponseModel, MonthlyBilling
 
 class DBInterface(ABC):
+    """
+    Chat, feedback and billing storage. An implementation may define its I/O methods as
+    coroutines (MotorMongoDB) or blocking functions (MongoDB); async callers go through
+    `src.db.db_factory.factory.call_db`, which handles both.
+    """
     
     @abstractmethod
     def connect(self) -> None:
@@ -33,11 +38,16 @@ class DBInterface(ABC):
         pass
     
     @abstractmethod
-    def get_all_feedbacks(self, is_liked: bool = False, page_number: int = 1, page_size: int = 10) -> Any:
+    def get_all_feedbacks(self, is_liked: bool = False, page_number: int = 1, page_size: int = 10, before: str = None, after: str = None, include_total: bool = False) -> Any:
         pass
     
     @abstractmethod
-    def count_feedbacks(self) -> Any:
+    def count_feedbacks(self, company_id: str = None, day: str = None) -> Any:
+        pass
+    
+    @abstractmethod
+    def get_feedback_stats_breakdown(self, scope: str, date_from: str = None, date_to: str = None) -> List[Dict[str, Any]]:
+        """Message and feedback totals per company or per day"""
         pass
     
     @abstractmethod
@@ -77,10 +87,20 @@ class DBInterface(ABC):
         """
         pass
     
+    @abstractmethod
+    def post_chat_pairs(self, turns: List[Dict[str, Any]]) -> None:
+        """Persist many chat turns (question, answer and billing) in one batch"""
+        pass
+    
     @abstractmethod
     def update_billing(self, date: str, company_id: str, input_token: int, output_token: int) -> Any:
         pass
     
+    @abstractmethod
+    def get_live_billing(self, frequency: str, date: str, company_id: str) -> Dict[str, Any]:
+        """Totals of one billing period of a company, including increments not flushed yet"""
+        pass
+    
     @abstractmethod
     def get_overall_billing(self, date_from: str = None, date_to: str = None, frequency: str = "daily", page_number: int = 1, page_size: int = 10):
         pass
@@ -94,8 +114,8 @@ class DBInterface(ABC):
         pass
     
     @abstractmethod
-    def get_chat_by_page(self, conversation_id: str, page_number: int, limit: int) -> MessagesResponseModel:
-        """Get a list of chat conversations and messages, sorted by the latest message's timestamp"""
+    def get_chat_by_page(self, conversation_id: str, page_number: int, limit: int, before: str = None, after: str = None, include_total: bool = False) -> MessagesResponseModel:
+        """Get a list of chat conversations and messages, sorted by the latest message's timestamp, by page number or by `before`/`after` cursor"""
         pass
     
     @abstractmethod
@@ -110,8 +130,8 @@ class DBInterface(ABC):
     
     # get all conversations of a user
     @abstractmethod
-    def get_all_conversations(self, user_id: str, page_number: int = 1, page_size: int = 10) -> AllConversationsResponseModel:
-        """Get all conversations of a user"""
+    def get_all_conversations(self, user_id: str, page_number: int = 1, page_size: int = 10, before: str = None, after: str = None, include_total: bool = False) -> AllConversationsResponseModel:
+        """Get all conversations of a user, by page number or by `before`/`after` cursor"""
         pass
     
     @abstractmethod
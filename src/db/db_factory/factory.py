@@ -0,0 +1,34 @@
+import asyncio
+import inspect
+import os
+from typing import Any, Callable
+from dotenv import load_dotenv
+
+from src.db.db_factory.db_interface import DBInterface
+
+
+def create_db_instance() -> DBInterface:
+    """Create the MongoDB implementation selected by MONGO_DRIVER (pymongo or motor)"""
+    load_dotenv()
+    driver = os.getenv("MONGO_DRIVER", "pymongo").lower()
+
+    if driver == "motor":
+        from src.db.db_factory.mongo.motor_mongo import MotorMongoDB
+        return MotorMongoDB()
+
+    if driver == "pymongo":
+        from src.db.db_factory.mongo.mongo import MongoDB
+        return MongoDB()
+
+    raise ValueError(f"Unknown MONGO_DRIVER: {driver}")
+
+
+async def call_db(method: Callable, *args, **kwargs) -> Any:
+    """
+    Call a DBInterface method from async code whichever driver implements it:
+    coroutines are awaited, blocking pymongo calls run in a worker thread so they
+    don't stall the event loop.
+    """
+    if inspect.iscoroutinefunction(method):
+        return await method(*args, **kwargs)
+    return await asyncio.to_thread(method, *args, **kwargs)
@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+from src.db.db_factory.mongo.billing_periods import parse_period_title
+
+# (frequency, date, company_id) of a billing document, `date` being the period title
+BillingKey = Tuple[str, str, str]
+
+# a replayed flush is recognised as long as it is among the last APPLIED_FLUSHES flushes of the document
+APPLIED_FLUSHES = 20
+DUPLICATE_KEY = 11000
+BILLING_KEY_FIELDS = ["frequency", "date", "company_id"]
+
+
+class BillingAccumulator:
+    """
+    Aggregates billing increments in memory and writes them to MongoDB in batches.
+
+    Every reply used to send three upserts to the same few hot documents; here the deltas
+    are summed per (frequency, period, company_id) and flushed with one unordered
+    bulk_write of $inc every `flush_interval` seconds or after `max_events` replies,
+    whichever comes first, and on shutdown.
+
+    Crash safety:
+    - a flush is tagged with a flush id that is pushed to `applied_flushes` of every
+      document it touches; a failed flush is retried with the same id and the filter
+      skips the documents it already reached, so retries never double count. This
+      needs the unique (frequency, date, company_id) index: `start` refuses to run
+      without it and the caller bills inline instead.
+    - deltas are only in memory until flushed: a worker killed without a shutdown loses
+      at most `flush_interval` seconds (or `max_events` replies) of billing. The chats
+      keep their tokens, so billing can be recomputed from them.
+    """
+
+    def __init__(self, collection: Collection, flush_interval: float = 5.0, max_events: int = 500):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self._pending: Dict[BillingKey, Dict[str, float]] = {}
+        # a flush that failed, retried with its flush id before anything else
+        self._inflight: Optional[Tuple[str, Dict[BillingKey, Dict[str, float]]]] = None
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.documents_written = 0
+
+    @classmethod
+    def from_env(cls, collection: Collection) -> Optional["BillingAccumulator"]:
+        """Build the accumulator from BILLING_* env vars, None when disabled"""
+        load_dotenv()
+        if os.getenv("BILLING_ACCUMULATOR_ENABLED", "true").lower() != "true":
+            return None
+        return cls(
+            collection=collection,
+            flush_interval=float(os.getenv("BILLING_FLUSH_INTERVAL", "5")),
+            max_events=int(os.getenv("BILLING_FLUSH_MAX_EVENTS", "500")),
+        )
+
+    def has_unique_index(self) -> bool:
+        """Whether the index turning a replayed flush into a duplicate key error exists"""
+        return any(
+            index.get("unique") and [field for field, _ in index["key"]] == BILLING_KEY_FIELDS
+            for index in self.collection.index_information().values()
+        )
+
+    def start(self) -> bool:
+        """Start the flush thread, False (and nothing started) when the unique billing index is missing"""
+        try:
+            indexed = self.has_unique_index()
+        except Exception as e:
+            print(f"Failed to check the billing indexes: {e}")
+            indexed = False
+        if not indexed:
+            print("Unique (frequency, date, company_id) billing index missing, billing is written inline")
+            return False
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="billing-accumulator", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        """Stop the background thread and flush the remaining deltas"""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Failed to flush billing on shutdown: {e}")
+
+    def add(self, increments: Dict[BillingKey, Dict[str, float]]) -> None:
+        with self._lock:
+            for key, increment in increments.items():
+                total = self._pending.setdefault(key, {"input_token": 0, "output_token": 0, "cost": 0.0})
+                for field, value in increment.items():
+                    total[field] += value
+            self._events += 1
+            if self._events >= self.max_events:
+                self._wake.set()
+
+    def unflushed(self, key: BillingKey) -> Dict[str, float]:
+        """Deltas of one billing document not yet in MongoDB (pending and in flight)"""
+        total = {"input_token": 0, "output_token": 0, "cost": 0.0}
+        with self._lock:
+            sources = [self._pending] + ([self._inflight[1]] if self._inflight else [])
+            for deltas in sources:
+                for field, value in deltas.get(key, {}).items():
+                    total[field] += value
+        return total
+
+    def flush(self) -> int:
+        """Write the pending deltas, returns the number of billing documents updated"""
+        with self._flush_lock:
+            with self._lock:
+                if self._inflight is None:
+                    if not self._pending:
+                        return 0
+                    self._inflight = (uuid.uuid4().hex, self._pending)
+                    self._pending = {}
+                    self._events = 0
+                flush_id, deltas = self._inflight
+
+            try:
+                self._write(flush_id, deltas)
+            except Exception:
+                self.failed_flushes += 1
+                raise
+
+            with self._lock:
+                self._inflight = None
+            self.flushes += 1
+            self.documents_written += len(deltas)
+            return len(deltas)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            pending = len(self._pending)
+            inflight = len(self._inflight[1]) if self._inflight else 0
+        return {
+            "pending_documents": pending,
+            "inflight_documents": inflight,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "documents_written": self.documents_written,
+        }
+
+    def _write(self, flush_id: str, deltas: Dict[BillingKey, Dict[str, float]]) -> None:
+        updates: List[UpdateOne] = [
+            UpdateOne(
+                {"frequency": frequency, "date": date, "company_id": company_id, "applied_flushes": {"$ne": flush_id}},
+                {
+                    "$inc": increment,
+                    "$push": {"applied_flushes": {"$each": [flush_id], "$slice": -APPLIED_FLUSHES}},
+                    # set on every write, documents from before `period` existed get it too
+                    "$set": {"period": parse_period_title(frequency, date)},
+                },
+                upsert=True,
+            )
+            for (frequency, date, company_id), increment in deltas.items()
+        ]
+        try:
+            self.collection.bulk_write(updates, ordered=False)
+        except BulkWriteError as e:
+            # a document that already has this flush id does not match the filter, the upsert
+            # then collides with the unique (frequency, date, company_id) index: already applied
+            errors = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY]
+            if errors:
+                raise
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Failed to flush billing, retrying: {e}")
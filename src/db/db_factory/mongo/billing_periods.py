@@ -0,0 +1,104 @@
+import argparse
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from pymongo import UpdateOne
+from pymongo.database import Database
+
+# `date` of a billing document per frequency, kept as the display title and upsert key
+PERIOD_FORMATS = {
+    "daily": "%d-%m-%Y",
+    "monthly": "%m-%Y",
+    "yearly": "%Y",
+}
+
+
+def period_title(frequency: str, date_obj: datetime) -> str:
+    return date_obj.strftime(PERIOD_FORMATS[frequency])
+
+
+def period_start(frequency: str, date_obj: datetime) -> datetime:
+    """First instant of the billing period containing `date_obj`, stored as the BSON date `period`"""
+    if frequency == "yearly":
+        return datetime(date_obj.year, 1, 1)
+    if frequency == "monthly":
+        return datetime(date_obj.year, date_obj.month, 1)
+    return datetime(date_obj.year, date_obj.month, date_obj.day)
+
+
+def parse_period_title(frequency: str, title: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(title, PERIOD_FORMATS[frequency])
+    except (KeyError, ValueError):
+        return None
+
+
+def period_range(frequency: str, date_from: Optional[datetime], date_to: Optional[datetime]) -> Dict[str, datetime]:
+    """`period` filter of the periods overlapping [date_from, date_to]"""
+    period_filter = {}
+    if date_from is not None:
+        period_filter["$gte"] = period_start(frequency, date_from)
+    if date_to is not None:
+        period_filter["$lte"] = period_start(frequency, date_to)
+    return period_filter
+
+
+def backfill_periods(db: Database, batch_size: int = 1000, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Set `period` on the billing documents written before it existed.
+
+    Safe to run while the app is serving: documents are walked in _id order in batches,
+    each batch is one unordered bulk_write of $set, and documents already having a
+    period (written since) are skipped, so the tool can be stopped and run again.
+    """
+    billing = db["billing"]
+    counts = {"scanned": 0, "updated": 0, "unparsable": 0}
+    last_id = None
+    while True:
+        query = {"period": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(billing.find(query, {"frequency": 1, "date": 1}).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        updates = []
+        for document in batch:
+            parsed = parse_period_title(document.get("frequency"), document.get("date", ""))
+            if parsed is None:
+                counts["unparsable"] += 1
+                print(f"Unparsable billing period: {document}")
+                continue
+            updates.append(UpdateOne(
+                {"_id": document["_id"], "period": {"$exists": False}},
+                {"$set": {"period": period_start(document["frequency"], parsed)}}
+            ))
+
+        counts["scanned"] += len(batch)
+        if updates and not dry_run:
+            counts["updated"] += billing.bulk_write(updates, ordered=False).modified_count
+        print(f"Billing period backfill: {counts}")
+    return counts
+
+
+if __name__ == "__main__":
+    from src.db.db_factory.mongo.indexes import ensure_indexes
+    from src.db.db_factory.mongo.mongo import MongoDB
+
+    parser = argparse.ArgumentParser(description="Backfill the sortable `period` date of billing documents")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="only count the documents to migrate")
+    args = parser.parse_args()
+
+    mongo = MongoDB()
+    mongo.connect()
+    try:
+        started = time.perf_counter()
+        backfill_periods(mongo.db, batch_size=args.batch_size, dry_run=args.dry_run)
+        if not args.dry_run:
+            ensure_indexes(mongo.db)
+        print(f"Done in {time.perf_counter() - started:.1f}s")
+    finally:
+        mongo.disconnect()
@@ -0,0 +1,102 @@
+import argparse
+import time
+from typing import Any, Dict, List, Tuple
+
+from pymongo import UpdateOne
+from pymongo.database import Database
+
+# counted fields of every counter document
+COUNTER_FIELDS = ("chats", "positive_feedback", "negative_feedback")
+SCOPES = ("global", "company", "day")
+
+# (scope, key) of a counter document, whose _id is "<scope>:<key>"
+CounterKey = Tuple[str, str]
+
+
+def counter_id(scope: str, key: str) -> str:
+    return f"{scope}:{key}"
+
+
+def counter_keys(company_id: str, timestamp: str) -> List[CounterKey]:
+    """The counters an event of a company at an ISO timestamp is counted in"""
+    return [("global", ""), ("company", company_id), ("day", timestamp[:10])]
+
+
+def add_count(counts: Dict[CounterKey, Dict[str, int]], company_id: str, timestamp: str, field: str, value: int = 1) -> None:
+    for key in counter_keys(company_id, timestamp):
+        total = counts.setdefault(key, {})
+        total[field] = total.get(field, 0) + value
+
+
+def counter_upserts(counts: Dict[CounterKey, Dict[str, int]]) -> List[UpdateOne]:
+    return [
+        UpdateOne(
+            {"_id": counter_id(scope, key)},
+            {"$inc": increment, "$setOnInsert": {"scope": scope, "key": key}},
+            upsert=True,
+        )
+        for (scope, key), increment in counts.items()
+    ]
+
+
+def counter_stats(document: Dict[str, Any]) -> Dict[str, Any]:
+    """A counter document in the shape count_feedbacks has always returned"""
+    document = document or {}
+    return {
+        "total_messages": document.get("chats", 0) / 2,
+        "positive_feedback": document.get("positive_feedback", 0),
+        "negative_feedback": document.get("negative_feedback", 0),
+    }
+
+
+def reconcile_counters(db: Database) -> int:
+    """Recompute every counter from the chats and feedbacks, returns the number of counter documents"""
+    company = {"$ifNull": ["$company_id", {"$arrayElemAt": [{"$split": ["$conversation_id", "_"]}, 0]}]}
+    day = {"$substrCP": ["$created_at", 0, 10]}
+    counts: Dict[CounterKey, Dict[str, int]] = {}
+
+    for collection, field_expression in (
+        ("chats", "chats"),
+        ("feedbacks", {"$cond": ["$is_like", "positive_feedback", "negative_feedback"]}),
+    ):
+        rows = db[collection].aggregate([
+            {"$group": {"_id": {"company": company, "day": day, "field": field_expression}, "count": {"$sum": 1}}}
+        ], allowDiskUse=True)
+        for row in rows:
+            group = row["_id"]
+            # a day is the timestamp prefix counter_keys takes
+            add_count(counts, group["company"] or "", group["day"] or "", group["field"], row["count"])
+
+    updates = [
+        UpdateOne(
+            {"_id": counter_id(scope, key)},
+            {"$set": {"scope": scope, "key": key, **{field: total.get(field, 0) for field in COUNTER_FIELDS}}},
+            upsert=True,
+        )
+        for (scope, key), total in counts.items()
+    ]
+    if updates:
+        db["counters"].bulk_write(updates, ordered=False)
+    # counters of companies or days without any chat or feedback left
+    stale = db["counters"].delete_many({"_id": {"$nin": [counter_id(scope, key) for scope, key in counts]}}).deleted_count
+    print(f"Reconciled {len(updates)} counters, removed {stale}")
+    return len(updates)
+
+
+if __name__ == "__main__":
+    from src.db.db_factory.mongo.mongo import MongoDB
+
+    parser = argparse.ArgumentParser(
+        description="Recompute the chat and feedback counters from the chats and feedbacks collections. "
+                    "Writes made while it runs can be overwritten, schedule it when traffic is low."
+    )
+    parser.parse_args()
+
+    mongo = MongoDB()
+    mongo.connect()
+    try:
+        started = time.perf_counter()
+        reconcile_counters(mongo.db)
+        print(f"Done in {time.perf_counter() - started:.1f}s")
+    finally:
+        mongo.disconnect()
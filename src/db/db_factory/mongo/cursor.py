@@ -0,0 +1,84 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+
+def encode_cursor(document: Dict[str, Any], sort: List[Tuple[str, int]]) -> str:
+    """Opaque token holding the sort key values of a document"""
+    values = [str(document[field]) if field == "_id" else document.get(field) for field, _ in sort]
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort: List[Tuple[str, int]]) -> List[Any]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(sort):
+            raise ValueError("wrong number of values")
+        return [ObjectId(value) if field == "_id" else value for (field, _), value in zip(sort, values)]
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+
+def keyset_filter(sort: List[Tuple[str, int]], values: List[Any], forward: bool) -> Dict[str, Any]:
+    """
+    Filter selecting the documents after (forward) or before (backward) the cursor
+    position in `sort` order, e.g. for [(a, -1), (_id, -1)] going forward:
+    {$or: [{a: {$lt: va}}, {a: va, _id: {$lt: vid}}]}
+    """
+    branches = []
+    for position, (field, direction) in enumerate(sort):
+        goes_up = (direction == 1) == forward
+        branch = {prior_field: values[prior] for prior, (prior_field, _) in enumerate(sort[:position])}
+        branch[field] = {"$gt" if goes_up else "$lt": values[position]}
+        branches.append(branch)
+    return {"$or": branches}
+
+
+def page_query(query: Dict[str, Any], sort: List[Tuple[str, int]],
+               before: Optional[str] = None, after: Optional[str] = None) -> Tuple[Dict[str, Any], List[Tuple[str, int]]]:
+    """The filter and sort order fetching the page at a cursor, backwards when paging `before`"""
+    forward = before is None
+    if after is None and before is None:
+        return dict(query), sort
+    filtered = {"$and": [query, keyset_filter(sort, decode_cursor(after or before, sort), forward)]}
+    return filtered, sort if forward else [(field, -direction) for field, direction in sort]
+
+
+def page_result(documents: List[Dict[str, Any]], sort: List[Tuple[str, int]], limit: int,
+                before: Optional[str] = None, after: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str], bool]:
+    """The page and its cursors from the `limit + 1` documents fetched with page_query"""
+    forward = before is None
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    if not forward:
+        documents.reverse()
+
+    next_cursor = encode_cursor(documents[-1], sort) if documents and (has_more or not forward) else None
+    prev_cursor = encode_cursor(documents[0], sort) if documents and (after is not None or (before is not None and has_more)) else None
+    return documents, next_cursor, prev_cursor, has_more
+
+
+def find_page(collection, query: Dict[str, Any], sort: List[Tuple[str, int]], limit: int,
+              before: Optional[str] = None, after: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str], bool]:
+    """
+    Fetch one page with keyset pagination.
+
+    Returns the documents in `sort` order, the cursors pointing at the next and previous
+    pages and whether there are more documents in the direction of travel.
+    """
+    filtered, query_sort = page_query(query, sort, before=before, after=after)
+    # one extra document tells whether another page exists
+    documents = list(collection.find(filtered).sort(query_sort).limit(limit + 1))
+    return page_result(documents, sort, limit, before=before, after=after)
+
+
+async def find_page_async(collection, query: Dict[str, Any], sort: List[Tuple[str, int]], limit: int,
+                          before: Optional[str] = None, after: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str], bool]:
+    """find_page on a motor collection"""
+    filtered, query_sort = page_query(query, sort, before=before, after=after)
+    documents = await collection.find(filtered).sort(query_sort).limit(limit + 1).to_list(length=limit + 1)
+    return page_result(documents, sort, limit, before=before, after=after)
@@ -0,0 +1,136 @@
+import argparse
+import sys
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.database import Database
+from pymongo.errors import OperationFailure
+
+from src.db.db_factory.mongo.cursor import keyset_filter
+from src.db.db_factory.mongo.mongo import CHAT_SORT, CONVERSATION_SORT, FEEDBACK_SORT
+
+# Every access path of MongoDB (mongo.py) and the index that serves it.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "chats": [
+        # get_chat_by_page (page and cursor), get_chat_context, post_feedback (message pair lookup), _get_total_page
+        IndexModel([("conversation_id", ASCENDING), ("created_at", DESCENDING), ("role", ASCENDING), ("_id", DESCENDING)], name="conversation_created_role_id"),
+        # post_feedback
+        IndexModel([("message_id", ASCENDING)], name="message_id"),
+        # usage_rollups rebuild
+        IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING)], name="user_created"),
+    ],
+    "conversations": [
+        # create_conversation, post_two_chats, update_conversation_subject, delete_chat_by_conversation_id
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # get_all_conversations (page and cursor), _get_total_page_overall
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)], name="user_updated_id"),
+    ],
+    "feedbacks": [
+        # post_rating
+        IndexModel([("message_id", ASCENDING)], name="message_id"),
+        # get_all_feedbacks (page and cursor), _get_total_feedback_page_overall, count_feedbacks
+        IndexModel([("is_like", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="is_like_created_id"),
+    ],
+    "user_usage": [
+        # get_billing_by_user, rollup upserts and the $merge of the rebuild
+        IndexModel([("user_id", ASCENDING), ("month", ASCENDING)], name="user_month_unique", unique=True),
+    ],
+    "counters": [
+        # get_feedback_stats_breakdown (count_feedbacks reads by _id)
+        IndexModel([("scope", ASCENDING), ("key", ASCENDING)], name="scope_key"),
+    ],
+    "billing": [
+        # billing upserts (update_billing, post_chat_pairs, BillingAccumulator)
+        IndexModel([("frequency", ASCENDING), ("date", ASCENDING), ("company_id", ASCENDING)], name="frequency_date_company", unique=True),
+        # get_overall_billing, get_overall_billing_by_company: range on the period
+        IndexModel([("frequency", ASCENDING), ("period", ASCENDING)], name="frequency_period"),
+        # get_billing_by_company_id: range and sort on the period
+        IndexModel([("frequency", ASCENDING), ("company_id", ASCENDING), ("period", ASCENDING)], name="frequency_company_period"),
+    ],
+}
+
+
+def ensure_indexes(db: Database) -> Dict[str, List[str]]:
+    """Create the declared indexes, already existing ones are left untouched"""
+    created = {}
+    for collection_name, indexes in INDEXES.items():
+        created[collection_name] = []
+        for index in indexes:
+            try:
+                created[collection_name] += db[collection_name].create_indexes([index])
+            except OperationFailure as e:
+                # e.g. duplicates blocking a unique index, keep starting up without it
+                print(f"Failed to create index {index.document['name']} on {collection_name}: {e}")
+    print(f"MongoDB indexes ensured: {created}")
+    return created
+
+
+# The hot queries, each returning the explain output of the query as mongo.py runs it.
+HOT_QUERIES: List[Tuple[str, Callable[[Database], Dict[str, Any]]]] = [
+    ("get_chat_by_page", lambda db: db["chats"].find({"conversation_id": "c"}).sort(CHAT_SORT).skip(10).limit(10).explain()),
+    ("get_chat_by_page cursor", lambda db: db["chats"].find({"$and": [{"conversation_id": "c"}, keyset_filter(CHAT_SORT, ["t", "user", ObjectId()], True)]}).sort(CHAT_SORT).limit(11).explain()),
+    ("post_feedback message", lambda db: db["chats"].find({"message_id": "m"}).limit(1).explain()),
+    ("post_feedback pair", lambda db: db["chats"].find({"created_at": "t", "conversation_id": "c"}).explain()),
+    ("get_all_conversations", lambda db: db["conversations"].find({"user_id": "u"}).sort(CONVERSATION_SORT).skip(10).limit(10).explain()),
+    ("get_all_conversations cursor", lambda db: db["conversations"].find({"$and": [{"user_id": "u"}, keyset_filter(CONVERSATION_SORT, ["t", ObjectId()], True)]}).sort(CONVERSATION_SORT).limit(11).explain()),
+    ("conversation by id", lambda db: db["conversations"].find({"id": "c"}).limit(1).explain()),
+    ("post_rating", lambda db: db["feedbacks"].find({"message_id": "m"}).limit(1).explain()),
+    ("get_all_feedbacks", lambda db: db["feedbacks"].find({"is_like": True}).sort(FEEDBACK_SORT).skip(10).limit(10).explain()),
+    ("get_all_feedbacks cursor", lambda db: db["feedbacks"].find({"$and": [{"is_like": True}, keyset_filter(FEEDBACK_SORT, ["t", ObjectId()], True)]}).sort(FEEDBACK_SORT).limit(11).explain()),
+    ("update_billing", lambda db: db["billing"].find({"frequency": "daily", "date": "01-01-2025", "company_id": "1"}).limit(1).explain()),
+    ("get_billing_by_company_id", lambda db: db["billing"].find({"frequency": "daily", "company_id": "1", "period": {"$gte": datetime(2025, 1, 1)}}).sort("period", 1).limit(10).explain()),
+    ("get_overall_billing", lambda db: db.command("explain", {
+        "aggregate": "billing",
+        "pipeline": [{"$match": {"frequency": "daily", "period": {"$gte": datetime(2025, 1, 1)}}}, {"$group": {"_id": "$period", "cost": {"$sum": "$cost"}}}],
+        "cursor": {},
+    })),
+    ("get_feedback_stats_breakdown", lambda db: db["counters"].find({"scope": "day", "key": {"$gte": "2025-01-01"}}).sort("key", 1).explain()),
+    ("get_billing_by_user", lambda db: db["user_usage"].find({"user_id": "u"}).sort("month", 1).explain()),
+]
+
+
+def plan_stages(explain: Any) -> List[str]:
+    """All stage names found anywhere in an explain document"""
+    stages = []
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == "stage" and isinstance(value, str):
+                stages.append(value)
+            # rejected plans are alternatives that did not run
+            elif key != "rejectedPlans":
+                stages += plan_stages(value)
+    elif isinstance(explain, list):
+        for item in explain:
+            stages += plan_stages(item)
+    return stages
+
+
+def verify_indexes(db: Database) -> List[Tuple[str, List[str]]]:
+    """Return the hot queries whose winning plan contains a COLLSCAN"""
+    collection_scans = []
+    for name, explain in HOT_QUERIES:
+        stages = plan_stages(explain(db))
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        print(f"{status:>8}  {name}: {' > '.join(stages)}")
+        if "COLLSCAN" in stages:
+            collection_scans.append((name, stages))
+    return collection_scans
+
+
+if __name__ == "__main__":
+    from src.db.db_factory.mongo.mongo import MongoDB
+
+    parser = argparse.ArgumentParser(description="Create the MongoDB indexes and check the hot query plans")
+    parser.add_argument("--verify", action="store_true", help="explain the hot queries and fail on any COLLSCAN")
+    args = parser.parse_args()
+
+    mongo = MongoDB()
+    mongo.connect()
+    try:
+        ensure_indexes(mongo.db)
+        if args.verify and verify_indexes(mongo.db):
+            sys.exit(1)
+    finally:
+        mongo.disconnect()
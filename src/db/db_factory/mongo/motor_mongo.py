@@ -0,0 +1,316 @@
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
+
+from src.db.db_factory.mongo.counters import add_count, counter_stats, counter_upserts
+from src.db.db_factory.mongo.cursor import find_page_async
+from src.db.db_factory.mongo.mongo import CHAT_SORT, CONVERSATION_SORT, FEEDBACK_SORT, MongoDB, billing_increments
+from src.db.schemas import AllConversationsResponseModel, ChatMessageModel, FeedbacksResponseModel, MessagesResponseModel, MonthlyBilling
+from src.metrics.metrics import MongoCommandTimer
+from datetime import datetime
+from fastapi import HTTPException
+
+# connections of the blocking client kept for index builds and the write-behind thread
+BLOCKING_POOL_SIZE = 4
+
+
+class MotorMongoDB(MongoDB):
+    """
+    MongoDB on the asyncio driver (motor), selected with MONGO_DRIVER=motor.
+
+    Same collections, documents and queries as MongoDB, whose query building and
+    response formatting it reuses; every method doing I/O is a coroutine, so a request
+    waiting on MongoDB does not hold a threadpool thread. Routes call either
+    implementation through `call_db`.
+
+    Billing increments are written with the chats rather than through a
+    BillingAccumulator. `blocking` is a small pymongo MongoDB on the same database for
+    the callers that need blocking calls (ensure_indexes, the write-behind thread).
+    """
+
+    def __init__(self, uri: str = None, db_name: str = None, transactional_writes: bool = None, **pool_options):
+        super().__init__(uri=uri, db_name=db_name, transactional_writes=transactional_writes, **pool_options)
+        self.blocking = None
+
+    def connect(self) -> None:
+        """Create the motor client, call from a running event loop"""
+        self.client = AsyncIOMotorClient(self.uri, event_listeners=[MongoCommandTimer()], **self.pool_options)
+        self.db = self.client[self.db_name]
+        self.blocking = MongoDB(uri=self.uri, db_name=self.db_name, transactional_writes=self.transactional_writes,
+                                maxPoolSize=BLOCKING_POOL_SIZE, minPoolSize=0)
+        self.blocking.connect()
+        print(f"Connected to MongoDB database with motor: {self.db_name} (max pool size {self.pool_options['maxPoolSize']})")
+
+    def start_billing_accumulator(self) -> None:
+        """Billing is written with the chats, and `blocking` bills inline"""
+
+    def disconnect(self) -> None:
+        """Close database connection"""
+        if self.blocking is not None:
+            self.blocking.disconnect()
+            self.blocking = None
+        if self.client:
+            self.client.close()
+            self.client = None
+            self.db = None
+            print("Disconnected from MongoDB")
+
+    async def is_healthy(self) -> bool:
+        """Ping the server through the pool"""
+        try:
+            return self.client is not None and (await self.client.admin.command("ping")).get("ok") == 1
+        except Exception:
+            return False
+
+    async def create_conversation(self, conversation_id: str, subject: str, user_id: str) -> AllConversationsResponseModel:
+        """Create a new conversation in the database"""
+        current_timestamp = self._get_current_timestamp()
+        result = await self.db["conversations"].update_one(
+            {"id": conversation_id},
+            {"$setOnInsert": self._new_conversation(conversation_id, subject, user_id, current_timestamp)},
+            upsert=True
+        )
+        if result.upserted_id is not None:
+            print(f"Conversation {conversation_id} created.")
+
+    async def post_chat(self, conversation_id: str, user_id: str, role: str, message: str, msg_summary: str) -> ChatMessageModel:
+        """Post a chat message to the database"""
+        current_timestamp = self._get_current_timestamp()
+        new_conversation = self._new_conversation(conversation_id, message, user_id, current_timestamp)
+        new_conversation.pop("updated_at")
+        await self.db["conversations"].update_one(
+            {"id": conversation_id},
+            {"$set": {"updated_at": current_timestamp}, "$setOnInsert": new_conversation},
+            upsert=True
+        )
+
+        chat_document = {
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "role": role,
+            "message": message,
+            "msg_summary": msg_summary,
+            "created_at": current_timestamp,
+            "updated_at": current_timestamp
+        }
+        result = await self.db["chats"].insert_one(chat_document)
+        counts = {}
+        add_count(counts, conversation_id.split("_")[0], current_timestamp, "chats")
+        await self.db["counters"].bulk_write(counter_upserts(counts), ordered=False)
+        print(f"Chat posted to conversation {conversation_id}.")
+        return ChatMessageModel(
+            message_id=str(result.inserted_id),
+            conversation_id=conversation_id,
+            user_id=user_id,
+            role=role,
+            message=message,
+            msg_summary=msg_summary,
+            created_at=current_timestamp,
+            updated_at=current_timestamp
+        )
+
+    async def post_two_chats(self,
+        conversation_id: str,
+        first_user_id: str,
+        first_msg_id: str,
+        first_role: str,
+        first_message: str,
+        first_msg_summary: str,
+        second_user_id: str,
+        second_msg_id: str,
+        second_role: str,
+        second_message: str,
+        second_msg_summary: str,
+        input_token: int = 0,
+        output_token: int = 0
+    ) -> tuple[ChatMessageModel, ChatMessageModel]:
+        """Post two chat messages together to the database, see MongoDB.post_two_chats"""
+        current_timestamp = self._get_current_timestamp()
+        writes, _, models = self._chat_pair_writes(
+            current_timestamp, conversation_id,
+            first_user_id, first_msg_id, first_role, first_message, first_msg_summary,
+            second_user_id, second_msg_id, second_role, second_message, second_msg_summary,
+            input_token, output_token
+        )
+        await self._run_writes(writes)
+        return models
+
+    async def post_chat_pairs(self, turns: List[Dict[str, Any]]) -> None:
+        """Persist many chat turns at once, see MongoDB.post_chat_pairs"""
+        if not turns:
+            return
+        chats = self._chat_pairs_chats(turns)
+
+        async def apply(session=None) -> None:
+            failure = None
+            try:
+                inserted = set((await self.db["chats"].bulk_write(chats, ordered=False, session=session)).upserted_ids)
+            except BulkWriteError as e:
+                inserted, failure = self._upserted_indexes(e), e
+            for collection, operations in self._chat_pairs_rollups(turns, inserted):
+                if operations:
+                    await self.db[collection].bulk_write(operations, ordered=False, session=session)
+            if failure is not None:
+                raise failure
+
+        await self._transact(apply)
+
+    async def _run_writes(self, writes: List[tuple]) -> None:
+        async def apply(session=None) -> None:
+            for collection, operations in writes:
+                if operations:
+                    await self.db[collection].bulk_write(operations, ordered=False, session=session)
+
+        await self._transact(apply)
+
+    async def _transact(self, apply) -> None:
+        if self.transactional_writes:
+            async with await self.client.start_session() as session:
+                await session.with_transaction(apply)
+        else:
+            await apply()
+
+    async def update_billing(self, date: str, company_id: str, input_token: int, output_token: int) -> Any:
+        try:
+            increments = billing_increments(date, company_id, input_token, output_token)
+        except ValueError as e:
+            return {"error": f"Invalid date format. Details: {e}"}
+
+        await self.db["billing"].bulk_write(self._billing_upserts(increments), ordered=False)
+        return {"message": "Billing updated successfully"}
+
+    async def get_live_billing(self, frequency: str, date: str, company_id: str) -> Dict[str, Any]:
+        """Totals of one billing document, nothing is held back unflushed with motor"""
+        flushed = await self.db["billing"].find_one({"frequency": frequency, "date": date, "company_id": company_id})
+        return self._live_billing(frequency, date, company_id, flushed)
+
+    async def get_overall_billing(self, date_from: str = None, date_to: str = None, frequency: str = "daily", page_number: int = 1, page_size: int = 10):
+        pipeline = self._overall_billing_pipeline(date_from, date_to, frequency, page_number, page_size)
+        result = await self.db["billing"].aggregate(pipeline, allowDiskUse=True).to_list(length=1)
+        return self._overall_billing_response(result[0] if result else None, frequency, page_number, page_size)
+
+    async def get_overall_billing_by_company(self, date_from: str = None, date_to: str = None, frequency: str = "daily", page_number: int = 1, page_size: int = 10):
+        pipeline = self._company_billing_pipeline(date_from, date_to, frequency, page_number, page_size)
+        result = await self.db["billing"].aggregate(pipeline, allowDiskUse=True).to_list(length=1)
+        return self._company_billing_response(result[0] if result else None, page_number, page_size)
+
+    async def get_billing_by_company_id(self, date_from: str = None, date_to: str = None, frequency: str = "daily", company_id: str = "", page_number: int = 1, page_size: int = 10):
+        billing_collection = self.db["billing"]
+        query = self._company_id_billing_query(date_from, date_to, frequency, company_id)
+        skip = (page_number - 1) * page_size
+        billing_data = await billing_collection.find(query).sort("period", 1).skip(skip).limit(page_size).to_list(length=page_size)
+        total_count = await billing_collection.count_documents(query)
+        return self._company_id_billing_response(billing_data, total_count, frequency, page_number, page_size)
+
+    async def get_chat_by_page(self, conversation_id: str, page_number: int = None, limit: int = 10, before: str = None, after: str = None, include_total: bool = False) -> MessagesResponseModel:
+        """Get a page of chat messages, see MongoDB.get_chat_by_page"""
+        chats_collection = self.db["chats"]
+        query = {"conversation_id": conversation_id}
+
+        if before is not None or after is not None:
+            page = await find_page_async(chats_collection, query, CHAT_SORT, limit, before=before, after=after)
+            chats, metadata = self._keyset_metadata(page, await chats_collection.count_documents(query) if include_total else None, limit)
+        else:
+            total_entries = await chats_collection.count_documents(query)
+            total_pages = (total_entries + limit - 1) // limit
+            # If page_number is not provided or is None, fetch the latest page
+            if page_number is None or page_number > total_pages:
+                page_number = total_pages
+            skip_count = (page_number - 1) * limit
+            chats = await chats_collection.find(query).sort(CHAT_SORT).skip(skip_count).limit(limit).to_list(length=limit)
+            metadata = self._offset_metadata(chats, CHAT_SORT, total_entries, page_number, total_pages, limit)
+
+        return self._messages_response(chats, metadata)
+
+    async def delete_chat_by_conversation_id(self, conversation_id: str):
+        """Delete a conversation by its ID"""
+        try:
+            deleted = (await self.db["chats"].delete_many({"conversation_id": conversation_id})).deleted_count
+            await self.db["conversations"].delete_one({"id": conversation_id})
+            if deleted:
+                await self.db["counters"].bulk_write(self._deleted_chat_counter_updates(conversation_id, deleted), ordered=False)
+            print(f"Conversation {conversation_id} deleted.")
+            return {"message": "Chats deleted successfully"}
+        except Exception as e:
+            print(f"Failed to delete conversation: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to delete conversation")
+
+    async def get_chat_context(self, conversation_id: str) -> List[Dict[str, Any]]:
+        """Get the recent 6 chats for a given conversation id"""
+        return await self.db["chats"].find({"conversation_id": conversation_id}).sort("timestamp", -1).limit(6).to_list(length=6)
+
+    async def get_all_conversations(self, user_id: str, page_number: int = 1, page_size: int = 10, before: str = None, after: str = None, include_total: bool = False) -> AllConversationsResponseModel:
+        """Get all conversations of a user, see MongoDB.get_all_conversations"""
+        conversations_collection = self.db["conversations"]
+        query = {"user_id": user_id}
+
+        if before is not None or after is not None:
+            page = await find_page_async(conversations_collection, query, CONVERSATION_SORT, page_size, before=before, after=after)
+            conversations, metadata = self._keyset_metadata(page, await conversations_collection.count_documents(query) if include_total else None, page_size)
+        else:
+            total_entries = await conversations_collection.count_documents(query)
+            total_pages = (total_entries + page_size - 1) // page_size
+            skip_count = (page_number - 1) * page_size
+            conversations = await conversations_collection.find(query).sort(CONVERSATION_SORT).skip(skip_count).limit(page_size).to_list(length=page_size)
+            metadata = self._offset_metadata(conversations, CONVERSATION_SORT, total_entries, page_number, total_pages, page_size)
+
+        return self._conversations_response(conversations, metadata)
+
+    async def post_feedback(self, message_id: str, is_like: bool) -> None:
+        message_collection = self.db["chats"]
+        current_timestamp = self._get_current_timestamp()
+        the_message = await message_collection.find_one({"message_id": message_id})
+        message_pair = await message_collection.find(self._message_pair_query(the_message)).to_list(length=None)
+        feedback, counter_updates = self._feedback_writes(message_id, is_like, the_message, message_pair, current_timestamp)
+        await self.db["feedbacks"].insert_one(feedback)
+        await self.db["counters"].bulk_write(counter_updates, ordered=False)
+        return {"message": "Feedback posted successfully"}
+
+    async def post_rating(self, message_id: str, rating: int) -> None:
+        feedback_collection = self.db["feedbacks"]
+        result = await feedback_collection.update_one({"message_id": message_id}, {"$set": {"rating": rating}})
+        if not result.matched_count:
+            raise HTTPException(status_code=404, detail="Feedback not found")
+        return {"message": "Rating updated successfully"}
+
+    async def update_conversation_subject(self, conversation_id: str, subject: str) -> None:
+        await self.db["conversations"].update_one({"id": conversation_id}, {"$set": {"subject": subject}})
+        return {"message": "Conversation subject updated successfully"}
+
+    async def get_all_feedbacks(self, is_liked: bool = False, page_number: int = 1, page_size: int = 10, before: str = None, after: str = None, include_total: bool = False) -> FeedbacksResponseModel:
+        feedback_collection = self.db["feedbacks"]
+        query = {"is_like": is_liked}
+
+        if before is not None or after is not None:
+            page = await find_page_async(feedback_collection, query, FEEDBACK_SORT, page_size, before=before, after=after)
+            feedbacks, metadata = self._keyset_metadata(page, await feedback_collection.count_documents(query) if include_total else None, page_size)
+        else:
+            total_entries = await feedback_collection.count_documents(query)
+            total_pages = (total_entries + page_size - 1) // page_size
+            skip_count = (page_number - 1) * page_size
+            feedbacks = await feedback_collection.find(query).sort(FEEDBACK_SORT).skip(skip_count).limit(page_size).to_list(length=page_size)
+            metadata = self._offset_metadata(feedbacks, FEEDBACK_SORT, total_entries, page_number, total_pages, page_size)
+        return self._feedbacks_response(feedbacks, metadata)
+
+    async def count_feedbacks(self, company_id: str = None, day: str = None) -> Any:
+        """Message and feedback totals, overall or of one company or day, read from a single counter document"""
+        return counter_stats(await self.db["counters"].find_one({"_id": self._feedback_counter_id(company_id, day)}))
+
+    async def get_feedback_stats_breakdown(self, scope: str, date_from: str = None, date_to: str = None) -> List[Dict[str, Any]]:
+        """Message and feedback totals per company ("company") or per day ("day", YYYY-MM-DD range)"""
+        counters = self.db["counters"].find(self._breakdown_query(scope, date_from, date_to)).sort("key", 1)
+        return [self._breakdown_row(scope, counter) async for counter in counters]
+
+    async def get_billing_by_user(self, user_id: str) -> List[MonthlyBilling]:
+        """Monthly billing of a user from the `user_usage` rollups"""
+        return [self._monthly_billing(record) async for record in self.db["user_usage"].find({"user_id": user_id}).sort("month", 1)]
+
+    async def post_file(self, file_name: str, user_id: str = -1, company_id: str = -1) -> None:
+        """Post a file to the database"""
+        await self.db["files"].insert_one({
+            "file_name": file_name,
+            "user_id": str(user_id),
+            "company_id": str(company_id),
+            "created_at": datetime.now()
+        })
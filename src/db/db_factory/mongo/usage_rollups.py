@@ -0,0 +1,85 @@
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+from pymongo import UpdateOne
+from pymongo.database import Database
+
+# (user_id, month) of a user_usage document, month being "YYYY-MM"
+UsageKey = Tuple[str, str]
+
+
+def usage_month(timestamp: str) -> str:
+    """Month of an ISO chat timestamp, the same month get_billing_by_user used to derive with $toDate"""
+    return timestamp[:7]
+
+
+def add_usage(usage: Dict[UsageKey, Dict[str, int]], user_id: str, timestamp: str, input_token: int, output_token: int) -> None:
+    total = usage.setdefault((user_id, usage_month(timestamp)), {"input_token": 0, "output_token": 0})
+    total["input_token"] += input_token
+    total["output_token"] += output_token
+
+
+def usage_upserts(usage: Dict[UsageKey, Dict[str, int]]) -> List[UpdateOne]:
+    return [
+        UpdateOne({"user_id": user_id, "month": month}, {"$inc": increment}, upsert=True)
+        for (user_id, month), increment in usage.items()
+    ]
+
+
+def rebuild_user_usage(db: Database) -> int:
+    """Recompute `user_usage` from the chats, returns the number of rollup documents"""
+    db["chats"].aggregate([
+        {"$match": {"user_id": {"$exists": True}}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "month": {"$substrCP": ["$created_at", 0, 7]}},
+            "input_token": {"$sum": {"$ifNull": ["$input_token", 0]}},
+            "output_token": {"$sum": {"$ifNull": ["$output_token", 0]}},
+        }},
+        {"$project": {"_id": 0, "user_id": "$_id.user_id", "month": "$_id.month", "input_token": 1, "output_token": 1}},
+        {"$merge": {"into": "user_usage", "on": ["user_id", "month"], "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ], allowDiskUse=True)
+    return db["user_usage"].count_documents({})
+
+
+def rebuild_conversation_usage(db: Database) -> int:
+    """Recompute the input_token/output_token totals of every conversation from its chats"""
+    db["chats"].aggregate([
+        {"$group": {
+            "_id": "$conversation_id",
+            "input_token": {"$sum": {"$ifNull": ["$input_token", 0]}},
+            "output_token": {"$sum": {"$ifNull": ["$output_token", 0]}},
+        }},
+        {"$project": {"_id": 0, "id": "$_id", "input_token": 1, "output_token": 1}},
+        # only conversations that still exist, a deleted one is not brought back
+        {"$merge": {"into": "conversations", "on": "id", "whenMatched": "merge", "whenNotMatched": "discard"}},
+    ], allowDiskUse=True)
+    return db["conversations"].count_documents({"input_token": {"$exists": True}})
+
+
+if __name__ == "__main__":
+    from src.db.db_factory.mongo.indexes import ensure_indexes
+    from src.db.db_factory.mongo.mongo import MongoDB
+
+    parser = argparse.ArgumentParser(
+        description="Rebuild the per-user and per-conversation token rollups from the chats. "
+                    "Increments written while it runs can be overwritten, run it when chat traffic is low."
+    )
+    parser.add_argument("--users", action="store_true", help="only rebuild user_usage")
+    parser.add_argument("--conversations", action="store_true", help="only rebuild the conversation totals")
+    args = parser.parse_args()
+    rebuild_all = not args.users and not args.conversations
+
+    mongo = MongoDB()
+    mongo.connect()
+    try:
+        # $merge needs the unique indexes on its `on` fields
+        ensure_indexes(mongo.db)
+        if args.users or rebuild_all:
+            started = time.perf_counter()
+            print(f"Rebuilt {rebuild_user_usage(mongo.db)} user_usage documents in {time.perf_counter() - started:.1f}s")
+        if args.conversations or rebuild_all:
+            started = time.perf_counter()
+            print(f"Rebuilt the totals of {rebuild_conversation_usage(mongo.db)} conversations in {time.perf_counter() - started:.1f}s")
+    finally:
+        mongo.disconnect()
@@ -29,12 +29,17 @@ class ConversationModel(BaseModel):
     subject: str
     created_at: datetime
     updated_at: datetime
+    input_token: int = Field(0, description="Input tokens used in the conversation")
+    output_token: int = Field(0, description="Output tokens used in the conversation")
 
 class MetadataModel(BaseModel):
     total: Optional[int] = Field(None, description="Total number of entries")
-    page_number: int
-    total_pages: int
+    page_number: Optional[int] = Field(None, description="Page number, not set when paginating with cursors")
+    total_pages: Optional[int] = Field(None, description="Total number of pages, not set when paginating with cursors")
     page_size: int
+    next_cursor: Optional[str] = Field(None, description="Pass as `after` to fetch the next page")
+    prev_cursor: Optional[str] = Field(None, description="Pass as `before` to fetch the previous page")
+    has_more: Optional[bool] = Field(None, description="Whether another page follows in the direction of travel")
 
 class AllConversationsResponseModel(BaseModel):
     conversations: List[ConversationModel]
@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from src.db.db_factory.db_interface import DBInterface
+from src.metrics.metrics import observe_stage
+
+
+class DurableQueue:
+    """
+    FIFO of chat turns on local disk, shared by all workers of the host through sqlite.
+
+    A consumer claims a batch with a lease; rows are deleted once acknowledged. Rows
+    claimed by a worker that died are claimed again when the lease runs out, so a turn is
+    only gone once it has been written to the database. Rows that keep failing are moved
+    to the `dead` table instead of being dropped.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 60.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # survives a crashed or restarted worker, only a power loss can lose the last commits
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, enqueued_at REAL NOT NULL, claimed_by TEXT, lease_until REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead (id INTEGER PRIMARY KEY, payload TEXT NOT NULL, attempts INTEGER NOT NULL, "
+            "enqueued_at REAL NOT NULL, error TEXT, failed_at REAL NOT NULL)"
+        )
+
+    def put(self, payload: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute("INSERT INTO pending (payload, enqueued_at) VALUES (?, ?)", (json.dumps(payload), time.time()))
+
+    def claim(self, consumer: str, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Lease up to `limit` of the oldest unclaimed (or expired) rows"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, payload FROM pending WHERE claimed_by IS NULL OR lease_until < ? ORDER BY id LIMIT ?", (now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE pending SET claimed_by = ?, lease_until = ? WHERE id = ?",
+                    [(consumer, now + self.lease_seconds, row_id) for row_id, _ in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def ack(self, ids: List[int]) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM pending WHERE id = ?", [(row_id,) for row_id in ids])
+
+    def release(self, ids: List[int], error: str, max_attempts: int) -> int:
+        """Give failed rows back to the queue, rows out of attempts go to `dead`; returns the number of dead rows"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "UPDATE pending SET attempts = attempts + 1, claimed_by = NULL, lease_until = NULL WHERE id = ?",
+                    [(row_id,) for row_id in ids]
+                )
+                placeholders = ",".join("?" * len(ids))
+                dead = self._conn.execute(
+                    f"INSERT INTO dead (id, payload, attempts, enqueued_at, error, failed_at) "
+                    f"SELECT id, payload, attempts, enqueued_at, ?, ? FROM pending WHERE id IN ({placeholders}) AND attempts >= ?",
+                    [error, now, *ids, max_attempts]
+                ).rowcount
+                self._conn.execute(f"DELETE FROM pending WHERE id IN ({placeholders}) AND attempts >= ?", [*ids, max_attempts])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return dead
+
+    def requeue_dead(self) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                moved = self._conn.execute(
+                    "INSERT INTO pending (payload, enqueued_at) SELECT payload, enqueued_at FROM dead ORDER BY id"
+                ).rowcount
+                self._conn.execute("DELETE FROM dead")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return moved
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending, oldest = self._conn.execute("SELECT COUNT(*), MIN(enqueued_at) FROM pending").fetchone()
+            dead = self._conn.execute("SELECT COUNT(*) FROM dead").fetchone()[0]
+        return {
+            "pending": pending,
+            "dead": dead,
+            "oldest_pending_seconds": time.time() - oldest if oldest is not None else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ChatWriteBehind:
+    """
+    Write-behind persistence for chat turns.
+
+    The chat routes `enqueue` a turn into the DurableQueue and return; a background thread
+    drains the queue every `flush_interval` seconds (or as soon as `batch_size` turns are
+    waiting) into `DBInterface.post_chat_pairs`, one bulk_write per collection per batch.
+    A failed batch is retried with exponential backoff, rows failing `max_attempts` times
+    are kept in the dead table. `stop()` flushes what is left before the worker exits.
+    """
+
+    def __init__(self, db: DBInterface, queue: DurableQueue, batch_size: int = 200, flush_interval: float = 1.0,
+                 max_attempts: int = 10, max_backoff: float = 30.0):
+        self.db = db
+        self.queue = queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.consumer = f"{os.uname().nodename}:{os.getpid()}"
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._enqueued_since_flush = 0
+        self._failures = 0
+
+        self.written = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.dead = 0
+
+    @classmethod
+    def from_env(cls, db: DBInterface) -> Optional["ChatWriteBehind"]:
+        """Build the writer from WRITE_BEHIND_* env vars, None when disabled"""
+        load_dotenv()
+        if os.getenv("WRITE_BEHIND_ENABLED", "true").lower() != "true":
+            return None
+        return cls(
+            db=db,
+            queue=DurableQueue(
+                path=os.getenv("WRITE_BEHIND_PATH", ".cache/write_behind.sqlite3"),
+                lease_seconds=float(os.getenv("WRITE_BEHIND_LEASE_SECONDS", "60")),
+            ),
+            batch_size=int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "200")),
+            flush_interval=float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "1.0")),
+            max_attempts=int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "10")),
+        )
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="chat-write-behind", daemon=True)
+        self._thread.start()
+        print(f"Chat write-behind started ({self.queue.stats()['pending']} turns pending)")
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop the background thread and flush the remaining turns"""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.flush() > 0:
+            pass
+        self.queue.close()
+        print(f"Chat write-behind stopped, {self.written} turns written")
+
+    def enqueue(self, turn: Dict[str, Any]) -> None:
+        self.queue.put(turn)
+        self._enqueued_since_flush += 1
+        if self._enqueued_since_flush >= self.batch_size:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Write one batch, returns the number of turns written (0 when empty or failed)"""
+        rows = self.queue.claim(self.consumer, self.batch_size)
+        if not rows:
+            return 0
+        ids = [row_id for row_id, _ in rows]
+        started = time.perf_counter()
+        try:
+            self.db.post_chat_pairs([turn for _, turn in rows])
+        except Exception as e:
+            self.failed_batches += 1
+            self._failures += 1
+            self.dead += self.queue.release(ids, str(e), self.max_attempts)
+            print(f"Failed to write {len(rows)} chat turns (attempt {self._failures}): {e}")
+            return 0
+        observe_stage("persistence", time.perf_counter() - started)
+        self.queue.ack(ids)
+        self._failures = 0
+        self.written += len(rows)
+        self.batches += 1
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.queue.stats(),
+            "written": self.written,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "dead_lettered": self.dead,
+        }
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            backoff = min(self.flush_interval * (2 ** self._failures), self.max_backoff) if self._failures else self.flush_interval
+            self._wake.wait(backoff)
+            self._wake.clear()
+            self._enqueued_since_flush = 0
+            try:
+                # keep draining while full batches come back
+                while not self._stopping.is_set() and self.flush() == self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"Chat write-behind error: {e}")
+
+
+if __name__ == "__main__":
+    from src.db.db_factory.mongo.mongo import MongoDB
+
+    parser = argparse.ArgumentParser(description="Inspect or drain the chat write-behind queue")
+    parser.add_argument("--requeue-dead", action="store_true", help="move dead lettered turns back to the queue")
+    parser.add_argument("--drain", action="store_true", help="write every pending turn to MongoDB")
+    args = parser.parse_args()
+
+    load_dotenv()
+    queue = DurableQueue(os.getenv("WRITE_BEHIND_PATH", ".cache/write_behind.sqlite3"))
+    if args.requeue_dead:
+        print(f"Requeued {queue.requeue_dead()} dead turns")
+    if args.drain:
+        mongo = MongoDB()
+        mongo.connect()
+        writer = ChatWriteBehind(mongo, queue)
+        while writer.flush() > 0:
+            pass
+        mongo.disconnect()
+    print(queue.stats())
+    queue.close()
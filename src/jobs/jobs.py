@@ -0,0 +1,314 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+# progress of the job running in the current thread, see report_progress
+_current_progress: ContextVar[Optional[Dict[str, Any]]] = ContextVar("job_progress", default=None)
+
+
+def report_progress(**fields) -> None:
+    """Record progress of the running job (stage, counts...), a no-op outside of a job"""
+    progress = _current_progress.get()
+    if progress is not None:
+        progress.update(fields)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobStore:
+    """
+    Background jobs in sqlite on local disk, shared by all workers of the host like the
+    write-behind queue, so any worker can answer for a job another one runs.
+
+    A runner claims the oldest queued job with a lease it renews while the job runs. A
+    job whose runner died is claimed again once its lease runs out, until it used up
+    its attempts; seeding resumes from its checkpoint when that happens. Jobs of one kind
+    on the same `collection_name` (or both without one) run one at a time, the next waits
+    in the queue.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, finished_at REAL, updated_at REAL NOT NULL, "
+            "claimed_by TEXT, lease_until REAL, progress TEXT, result TEXT, error TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+
+    def create(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, params, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params), QUEUED, now, now)
+            )
+        return self.get(job_id)
+
+    def claim(self, consumer: str, lease_seconds: float, max_attempts: int) -> Optional[Dict[str, Any]]:
+        """Lease the oldest queued job, or a running one whose runner is gone, that no live job of its kind targets the same collection"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ?, claimed_by = NULL, lease_until = NULL "
+                    "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                    (FAILED, "The worker running the job stopped, no attempts left", now, now, RUNNING, now, max_attempts)
+                )
+                # a job waits while another one of its kind runs on the same collection with a live lease,
+                # two seeds of one collection would interleave their batches and checkpoints; jobs without
+                # a collection_name (uploads, all into the knowledge base collection) wait for each other (IS matches NULL)
+                row = self._conn.execute(
+                    "SELECT id FROM jobs AS job WHERE (job.status = ? OR (job.status = ? AND job.lease_until < ?)) "
+                    "AND NOT EXISTS (SELECT 1 FROM jobs AS other WHERE other.status = ? AND other.lease_until >= ? "
+                    "AND other.id != job.id AND other.kind = job.kind "
+                    "AND json_extract(other.params, '$.collection_name') IS json_extract(job.params, '$.collection_name')) "
+                    "ORDER BY job.created_at LIMIT 1",
+                    (QUEUED, RUNNING, now, RUNNING, now)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, claimed_by = ?, lease_until = ?, "
+                        "started_at = COALESCE(started_at, ?), updated_at = ? WHERE id = ?",
+                        (RUNNING, consumer, now + lease_seconds, now, now, row["id"])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def heartbeat(self, job_id: str, consumer: str, lease_seconds: float, progress: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_until = ?, progress = ?, updated_at = ? WHERE id = ? AND claimed_by = ? AND status = ?",
+                (now + lease_seconds, json.dumps(progress), now, job_id, consumer, RUNNING)
+            )
+
+    def finish(self, job_id: str, status: str, progress: Dict[str, Any], result: Any = None, error: str = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, progress = ?, result = ?, error = ?, finished_at = ?, updated_at = ?, "
+                "claimed_by = NULL, lease_until = NULL WHERE id = ?",
+                (status, json.dumps(progress), json.dumps(result, default=str), error, now, now, job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    def recent(self, limit: int = 20, status: str = None, kind: str = None) -> List[Dict[str, Any]]:
+        query, args = "SELECT * FROM jobs WHERE 1 = 1", []
+        if status:
+            query, args = query + " AND status = ?", args + [status]
+        if kind:
+            query, args = query + " AND kind = ?", args + [kind]
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY created_at DESC LIMIT ?", (*args, limit)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0, **{status: count for status, count in rows}}
+
+    def prune(self, older_than_seconds: float) -> int:
+        """Forget finished jobs"""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (SUCCEEDED, FAILED, time.time() - older_than_seconds)
+            ).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Dict[str, Any]:
+        now = time.time()
+        started, finished = row["started_at"], row["finished_at"]
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "params": json.loads(row["params"]),
+            "attempts": row["attempts"],
+            "progress": json.loads(row["progress"]) if row["progress"] else {},
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "started_at": started,
+            "finished_at": finished,
+            "queued_seconds": round((started or now) - row["created_at"], 2),
+            "run_seconds": round((finished or now) - started, 2) if started else None,
+        }
+
+
+class JobRunner:
+    """
+    Runs background jobs (seeding, knowledge base uploads) in a bounded pool of threads.
+
+    Routes `submit` a job and answer with its id right away; each worker process runs at
+    most `workers` jobs at a time, picked from the shared JobStore, and refuses new ones
+    with JobQueueFull while `max_queued` are waiting. A handler is called with the job
+    params as keyword arguments and returns the job result; it reports its progress
+    with `report_progress`, which is saved with the lease every `heartbeat_interval`.
+    """
+
+    def __init__(self, store: JobStore, handlers: Dict[str, Callable[..., Any]], workers: int = 1, lease_seconds: float = 60.0,
+                 heartbeat_interval: float = 2.0, poll_interval: float = 1.0, max_attempts: int = 2, max_queued: int = 20):
+        self.store = store
+        self.handlers = handlers
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.max_queued = max_queued
+        self.consumer = f"{os.uname().nodename}:{os.getpid()}"
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        # job id -> progress of the jobs this process runs
+        self._running: Dict[str, Dict[str, Any]] = {}
+        self._running_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, handlers: Dict[str, Callable[..., Any]]) -> "JobRunner":
+        """Build the runner from JOBS_* env vars; JOBS_WORKERS=0 only enqueues, for workers that must not run jobs"""
+        load_dotenv()
+        return cls(
+            store=JobStore(os.getenv("JOBS_PATH", ".cache/jobs.sqlite3")),
+            handlers=handlers,
+            workers=int(os.getenv("JOBS_WORKERS", "1")),
+            lease_seconds=float(os.getenv("JOBS_LEASE_SECONDS", "60")),
+            heartbeat_interval=float(os.getenv("JOBS_HEARTBEAT_SECONDS", "2")),
+            max_attempts=int(os.getenv("JOBS_MAX_ATTEMPTS", "2")),
+            max_queued=int(os.getenv("JOBS_MAX_QUEUED", "20")),
+        )
+
+    def start(self) -> None:
+        self._stopping.clear()
+        pruned = self.store.prune(float(os.getenv("JOBS_RETENTION_DAYS", "7")) * 86400)
+        self._threads = [threading.Thread(target=self._run, name=f"job-runner-{index}", daemon=True) for index in range(self.workers)]
+        if self._threads:
+            self._threads.append(threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        print(f"Job runner started with {self.workers} workers ({self.store.counts()[QUEUED]} jobs queued, {pruned} old jobs pruned)")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop taking jobs; a job still running is claimed again by another worker once its lease runs out"""
+        self._stopping.set()
+        self._wake.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        self._threads = []
+        self.store.close()
+        print("Job runner stopped")
+
+    def submit(self, kind: str, **params) -> Dict[str, Any]:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self.store.counts()[QUEUED] >= self.max_queued:
+            raise JobQueueFull(f"{self.max_queued} jobs are already waiting, try again later")
+        job = self.store.create(kind, params)
+        self._wake.set()
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._running_lock:
+            running_here = list(self._running)
+        return {**self.store.counts(), "workers": self.workers, "running_here": running_here}
+
+    def run_one(self) -> bool:
+        """Claim and run one job, returns False when none was waiting"""
+        job = self.store.claim(self.consumer, self.lease_seconds, self.max_attempts)
+        if job is None:
+            return False
+        progress = dict(job["progress"])
+        with self._running_lock:
+            self._running[job["id"]] = progress
+        token = _current_progress.set(progress)
+        print(f"Running {job['kind']} job {job['id']} (attempt {job['attempts']})")
+        try:
+            result = self.handlers[job["kind"]](**job["params"])
+        except Exception as e:
+            traceback.print_exc()
+            # errors carrying a report (IngestError) keep it as the result
+            self.store.finish(job["id"], FAILED, progress, result=getattr(e, "report", None), error=f"{type(e).__name__}: {e}")
+        else:
+            self.store.finish(job["id"], SUCCEEDED, progress, result=result)
+        finally:
+            _current_progress.reset(token)
+            with self._running_lock:
+                self._running.pop(job["id"], None)
+        return True
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                if self.run_one():
+                    continue
+            except Exception as e:
+                print(f"Job runner error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _heartbeat(self) -> None:
+        while not self._stopping.wait(self.heartbeat_interval):
+            with self._running_lock:
+                running = [(job_id, dict(progress)) for job_id, progress in self._running.items()]
+            for job_id, progress in running:
+                try:
+                    self.store.heartbeat(job_id, self.consumer, self.lease_seconds, progress)
+                except Exception as e:
+                    print(f"Job heartbeat error: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect background jobs")
+    parser.add_argument("job_id", nargs="?", help="show one job")
+    parser.add_argument("--status", default=None, choices=[QUEUED, RUNNING, SUCCEEDED, FAILED])
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    load_dotenv()
+    store = JobStore(os.getenv("JOBS_PATH", ".cache/jobs.sqlite3"))
+    if args.job_id:
+        print(json.dumps(store.get(args.job_id), indent=2))
+    else:
+        for job in store.recent(args.limit, args.status):
+            print(f"{job['id']} {job['kind']:<10} {job['status']:<9} {job['progress']} {job['error'] or ''}")
+        print(store.counts())
+    store.close()
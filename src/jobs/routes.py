@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from src.jobs.jobs import JobRunner
+
+router = APIRouter()
+
+async def get_jobs(request: Request) -> JobRunner:
+    # job runner created in the app lifespan
+    return request.app.state.jobs
+
+# Example API call: GET /jobs?status=running
+@router.get("/")
+async def list_jobs(status: str = None, kind: str = None, limit: int = 20, jobs: JobRunner = Depends(get_jobs)):
+    return {
+        "stats": jobs.stats(),
+        "jobs": jobs.store.recent(min(limit, 100), status, kind),
+    }
+
+# status, progress (stage and counts), timings, result and error of a seed or upload job
+@router.get("/{job_id}")
+async def get_job(job_id: str, jobs: JobRunner = Depends(get_jobs)):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
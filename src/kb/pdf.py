@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pypdf import PdfReader
+
+load_dotenv()
+
+# uploads are copied to disk this many bytes at a time instead of being read whole
+UPLOAD_CHUNK_BYTES = int(os.getenv("KB_UPLOAD_CHUNK_BYTES", str(1 << 20)))
+# per uploaded file, and for the PDFs of a zip together once unpacked
+UPLOAD_MAX_BYTES = int(os.getenv("KB_UPLOAD_MAX_BYTES", str(200 << 20)))
+# zip members inflating more than this are refused, text PDFs compress far less
+MAX_COMPRESSION_RATIO = int(os.getenv("KB_UPLOAD_MAX_COMPRESSION_RATIO", "100"))
+# smaller documents are read in the calling thread, starting processes costs more than it saves
+PARALLEL_MIN_PAGES = int(os.getenv("KB_PDF_PARALLEL_MIN_PAGES", "40"))
+PDF_PROCESSES = int(os.getenv("KB_PDF_PROCESSES", str(max((os.cpu_count() or 2) // 2, 1))))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def pdf_members(zip_path: str, directory: str) -> List[Tuple[str, str]]:
+    """
+    Unpack the PDFs of a zip upload to `directory`, returns (path, file name) pairs.
+
+    Members are named by their position in the archive, unpacking again (a retried job)
+    overwrites the files of the previous attempt instead of leaving them behind.
+    """
+    members = []
+    with zipfile.ZipFile(zip_path) as archive:
+        infos = [
+            info for info in archive.infolist()
+            if not info.is_dir() and info.filename.lower().endswith(".pdf") and not info.filename.startswith("__MACOSX/")
+        ]
+        # the sizes in the archive are checked before anything is unpacked, they are declared
+        # by whoever built the archive, the bytes actually inflated are counted below
+        if sum(info.file_size for info in infos) > UPLOAD_MAX_BYTES:
+            raise ValueError(f"The PDFs of {os.path.basename(zip_path)} are larger than {UPLOAD_MAX_BYTES} bytes unpacked")
+        for info in infos:
+            if info.compress_size and info.file_size / info.compress_size > MAX_COMPRESSION_RATIO:
+                raise ValueError(f"{info.filename} in {os.path.basename(zip_path)} is compressed more than {MAX_COMPRESSION_RATIO} times")
+        os.makedirs(directory, exist_ok=True)
+        written = 0
+        for index, info in enumerate(infos):
+            path = os.path.join(directory, f"{index}.pdf")
+            with archive.open(info) as source, open(path, "wb") as target:
+                while chunk := source.read(UPLOAD_CHUNK_BYTES):
+                    written += len(chunk)
+                    if written > UPLOAD_MAX_BYTES:
+                        raise ValueError(f"The PDFs of {os.path.basename(zip_path)} are larger than {UPLOAD_MAX_BYTES} bytes unpacked")
+                    target.write(chunk)
+            members.append((path, os.path.basename(info.filename)))
+    return members
+
+
+def _extract_range(path: str, start: int, stop: int) -> List[str]:
+    # runs in a pool process, each one opens the file itself
+    reader = PdfReader(path)
+    return [reader.pages[number].extract_text() for number in range(start, stop)]
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawned, forking a worker with live grpc and mongo clients is not safe
+            _pool = ProcessPoolExecutor(max_workers=PDF_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def extract_pages(path: str, executor: Executor = None, processes: int = None) -> List[str]:
+    """
+    Text of every page of a PDF, in order, as PyPDFLoader reads it.
+
+    Documents of PARALLEL_MIN_PAGES pages or more are split into page ranges read by
+    the shared process pool (KB_PDF_PROCESSES) or `executor`, page extraction being
+    CPU bound.
+    """
+    processes = processes or PDF_PROCESSES
+    page_count = len(PdfReader(path).pages)
+    if processes <= 1 or page_count < PARALLEL_MIN_PAGES:
+        return _extract_range(path, 0, page_count)
+
+    # a few ranges per process, so one slow range does not hold the others back
+    step = max(-(-page_count // (processes * 4)), 1)
+    executor = executor or _get_pool()
+    futures = [executor.submit(_extract_range, path, start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    return [text for future in futures for text in future.result()]
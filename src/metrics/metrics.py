@@ -0,0 +1,119 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Iterator, Optional
+
+from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from pymongo import monitoring
+
+load_dotenv()
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_LATENCY = Histogram(
+    "autoquery_http_request_seconds", "Latency of http requests", ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+CHAT_STAGE_LATENCY = Histogram(
+    "autoquery_chat_stage_seconds", "Latency of each stage of the chat pipeline", ["stage"], buckets=LATENCY_BUCKETS
+)
+MONGO_LATENCY = Histogram(
+    "autoquery_mongo_command_seconds", "Latency of MongoDB commands", ["command", "collection"], buckets=LATENCY_BUCKETS
+)
+MONGO_FAILURES = Counter(
+    "autoquery_mongo_command_failures_total", "Failed MongoDB commands", ["command", "collection"]
+)
+WEAVIATE_LATENCY = Histogram(
+    "autoquery_weaviate_operation_seconds", "Latency of weaviate operations", ["operation"], buckets=LATENCY_BUCKETS
+)
+TOKENS = Counter(
+    "autoquery_llm_tokens_total", "LLM tokens used per company", ["company_id", "kind"]
+)
+# company ids come from client supplied conversation ids, only the companies listed in
+# METRICS_COMPANY_IDS get their own series, every other one is counted as "other"
+TRACKED_COMPANIES = frozenset(company.strip() for company in os.getenv("METRICS_COMPANY_IDS", "").split(",") if company.strip())
+
+# stage timings of the current request, reported in the Server-Timing header
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    CHAT_STAGE_LATENCY.labels(stage=stage).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """Time one stage of the chat pipeline"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def timed_weaviate(operation: str):
+    """Decorator timing a weaviate helper"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                WEAVIATE_LATENCY.labels(operation=operation).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def company_label(company_id: str) -> str:
+    return company_id if company_id in TRACKED_COMPANIES else "other"
+
+
+def record_tokens(company_id: str, input_token: int, output_token: int) -> None:
+    company = company_label(company_id)
+    TOKENS.labels(company_id=company, kind="input").inc(input_token)
+    TOKENS.labels(company_id=company, kind="output").inc(output_token)
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Observes the duration of every command sent by a MongoClient"""
+
+    def __init__(self):
+        self._collections: Dict[int, str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._collections[event.request_id] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event):
+        collection = self._collections.pop(event.request_id, "")
+        MONGO_LATENCY.labels(command=event.command_name, collection=collection).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop(event.request_id, "")
+        MONGO_LATENCY.labels(command=event.command_name, collection=collection).observe(event.duration_micros / 1e6)
+        MONGO_FAILURES.labels(command=event.command_name, collection=collection).inc()
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Prometheus exposition of this worker, or of all workers in multiprocess mode"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
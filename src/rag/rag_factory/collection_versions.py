@@ -0,0 +1,73 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Monotonic per-collection version numbers. Every write to a collection (post, delete,
+# reseed) bumps its version so caches built on top of the collection can tell that
+# their entries are stale. Versions live in sqlite on local disk, shared by all workers
+# of the host (and the seed CLIs) like the write-behind queue; each worker re-reads a
+# version at most every COLLECTION_VERSION_TTL_SECONDS, so a write made by one worker
+# invalidates the caches of the others within that time.
+load_dotenv()
+VERSIONS_PATH = os.getenv("COLLECTION_VERSIONS_PATH", ".cache/collection_versions.sqlite3")
+VERSION_TTL_SECONDS = float(os.getenv("COLLECTION_VERSION_TTL_SECONDS", "2"))
+
+# collection -> (monotonic time it was read at, version)
+_versions: Dict[str, Tuple[float, int]] = {}
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+
+
+def _connection() -> sqlite3.Connection:
+    """The sqlite connection of this process, opened on first use (so after gunicorn forks), caller holds the lock"""
+    global _conn
+    if _conn is None:
+        directory = os.path.dirname(VERSIONS_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _conn = sqlite3.connect(VERSIONS_PATH, check_same_thread=False, timeout=10, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("CREATE TABLE IF NOT EXISTS versions (collection TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+    return _conn
+
+
+def get_collection_version(collection: str) -> int:
+    """Current version of a collection"""
+    with _lock:
+        cached = _versions.get(collection)
+        if cached is not None and time.monotonic() - cached[0] < VERSION_TTL_SECONDS:
+            return cached[1]
+        try:
+            row = _connection().execute("SELECT version FROM versions WHERE collection = ?", (collection,)).fetchone()
+        except sqlite3.Error as e:
+            # keep the last known version, the caches stay valid a little longer
+            print(f"Failed to read the version of {collection}: {e}")
+            return cached[1] if cached is not None else 0
+        version = row[0] if row is not None else 0
+        _versions[collection] = (time.monotonic(), version)
+        return version
+
+
+def bump_collection_version(collection: str) -> int:
+    """Mark a collection as modified and return its new version"""
+    with _lock:
+        conn = _connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO versions (collection, version) VALUES (?, 1) "
+                "ON CONFLICT(collection) DO UPDATE SET version = version + 1",
+                (collection,)
+            )
+            version = conn.execute("SELECT version FROM versions WHERE collection = ?", (collection,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        _versions[collection] = (time.monotonic(), version)
+    print(f"Collection {collection} is now at version {version}")
+    return version
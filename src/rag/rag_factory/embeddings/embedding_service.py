@@ -0,0 +1,185 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from openai import OpenAI
+
+
+def embedding_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent embedding store keyed by sha256(model, text), shared by all workers through sqlite"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # sqlite limits the number of bound parameters per statement
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, created_at) VALUES (?, ?, ?, ?)",
+                [(key, model, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class EmbeddingService:
+    """
+    Embeds text with the OpenAI embedding API.
+
+    Lookups go through a small in-memory LRU and then the on-disk cache; only the misses
+    are sent to OpenAI, in batches of `batch_size` texts per request. The time spent in
+    the API is tracked separately so embedding latency can be observed on its own.
+    """
+
+    def __init__(self, api_key: str, model: str = "text-embedding-3-small", cache_path: str = None,
+                 batch_size: int = 256, memory_cache_size: int = 2048):
+        self.model = model
+        self.batch_size = batch_size
+        self.client = OpenAI(api_key=api_key)
+        self.disk_cache = EmbeddingCache(cache_path) if cache_path else None
+        self.memory_cache_size = memory_cache_size
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.api_calls = 0
+        self.api_texts = 0
+        self.api_seconds = 0.0
+        self.last_api_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["EmbeddingService"]:
+        load_dotenv()
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            return None
+        return cls(
+            api_key=api_key,
+            model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
+            cache_path=os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3") or None,
+            batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "256")),
+            memory_cache_size=int(os.getenv("EMBEDDING_MEMORY_CACHE_SIZE", "2048")),
+        )
+
+    def embed(self, text: str) -> List[float]:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts, returning vectors in the same order"""
+        keys = [embedding_key(self.model, text) for text in texts]
+        vectors: Dict[str, List[float]] = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    vectors[key] = self._memory[key]
+                    self.memory_hits += 1
+
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing and self.disk_cache is not None:
+            from_disk = self.disk_cache.get_many(missing)
+            self.disk_hits += len(from_disk)
+            vectors.update(from_disk)
+            self._remember(from_disk)
+
+        to_embed = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                to_embed[key] = text
+
+        if to_embed:
+            embedded = self._call_api(to_embed)
+            vectors.update(embedded)
+            self._remember(embedded)
+            if self.disk_cache is not None:
+                self.disk_cache.put_many(self.model, embedded)
+
+        return [vectors[key] for key in keys]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "api_calls": self.api_calls,
+            "api_texts": self.api_texts,
+            "api_seconds_total": self.api_seconds,
+            "api_seconds_avg": self.api_seconds / self.api_calls if self.api_calls else 0.0,
+            "api_seconds_last": self.last_api_seconds,
+            "memory_entries": len(self._memory),
+            "disk_entries": self.disk_cache.count() if self.disk_cache is not None else 0,
+        }
+
+    def close(self) -> None:
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+        self.client.close()
+
+    def _call_api(self, to_embed: Dict[str, str]) -> Dict[str, List[float]]:
+        keys = list(to_embed.keys())
+        embedded = {}
+        for start in range(0, len(keys), self.batch_size):
+            batch = keys[start:start + self.batch_size]
+            started = time.perf_counter()
+            response = self.client.embeddings.create(model=self.model, input=[to_embed[key] for key in batch])
+            elapsed = time.perf_counter() - started
+
+            self.api_calls += 1
+            self.api_texts += len(batch)
+            self.api_seconds += elapsed
+            self.last_api_seconds = elapsed
+
+            for item in response.data:
+                embedded[batch[item.index]] = item.embedding
+        return embedded
+
+    def _remember(self, items: Dict[str, List[float]]) -> None:
+        with self._lock:
+            for key, vector in items.items():
+                self._memory[key] = vector
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_cache_size:
+                self._memory.popitem(last=False)
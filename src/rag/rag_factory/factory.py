@@ -0,0 +1,21 @@
+import os
+from dotenv import load_dotenv
+
+from src.rag.rag_factory.rag_interface import RAGInterface
+from src.rag.rag_factory.embeddings.embedding_service import EmbeddingService
+
+
+def create_rag_instance(embedding_service: EmbeddingService = None) -> RAGInterface:
+    """Create the RAG backend selected by RAG_BACKEND (weaviate or inprocess)"""
+    load_dotenv()
+    backend = os.getenv("RAG_BACKEND", "weaviate").lower()
+
+    if backend == "inprocess":
+        from src.rag.rag_factory.inprocess.inprocess import InProcessVectorIndex
+        return InProcessVectorIndex(embedding_service=embedding_service)
+
+    if backend == "weaviate":
+        from src.rag.rag_factory.weviate.weviate import WeviateDatabaseInistance
+        return WeviateDatabaseInistance(embedding_service=embedding_service)
+
+    raise ValueError(f"Unknown RAG_BACKEND: {backend}")
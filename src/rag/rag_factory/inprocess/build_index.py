@@ -0,0 +1,26 @@
+import argparse
+
+from src.rag.rag_factory.embeddings.embedding_service import EmbeddingService
+from src.rag.rag_factory.inprocess.inprocess import InProcessVectorIndex
+from src.rag.rag_factory.weviate.seed.dbOps.csv_poplator import get_data_rows
+
+
+def build_index(file_path: str, collection_name: str = "PIHR_DATASET", index_dir: str = None, quantize: bool = None) -> int:
+    """Build an in-process index collection from a knowledge base csv"""
+    index = InProcessVectorIndex(EmbeddingService.from_env(), index_dir=index_dir, quantize=quantize)
+    try:
+        return index.replace_collection(collection_name, get_data_rows(file_path))
+    finally:
+        index.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the in-process vector index from a csv")
+    parser.add_argument("--file", default="kb/PIHR_DATASET.csv")
+    parser.add_argument("--collection", default="PIHR_DATASET")
+    parser.add_argument("--index-dir", default=None)
+    parser.add_argument("--quantize", action="store_true", help="store int8 quantized vectors")
+    args = parser.parse_args()
+
+    count = build_index(args.file, args.collection, args.index_dir, args.quantize or None)
+    print(f"Indexed {count} chunks into {args.collection}")
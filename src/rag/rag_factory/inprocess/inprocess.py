@@ -0,0 +1,273 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.rag.rag_factory.rag_interface import RAGInterface
+from src.rag.rag_factory.embeddings.embedding_service import EmbeddingService
+from src.rag.rag_factory.collection_versions import bump_collection_version
+
+
+class IndexedCollection:
+    """One collection loaded from disk: a (n, dim) vector matrix and its chunk properties"""
+
+    def __init__(self, chunks: List[Dict[str, Any]], vectors: np.ndarray, scales: Optional[np.ndarray] = None):
+        self.chunks = chunks
+        self.vectors = vectors
+        # per row scale of int8 quantized vectors, None for float32 vectors
+        self.scales = scales
+        self.ids = {chunk["uuid"]: position for position, chunk in enumerate(chunks)}
+        # the files it was loaded from, and when they were last checked for a newer generation
+        self.source: Tuple[str, int] = ("", 0)
+        self.checked_at = 0.0
+
+    @property
+    def quantized(self) -> bool:
+        return self.scales is not None
+
+    def similarities(self, query_vector: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the (normalized) query with every row"""
+        if len(self.chunks) == 0:
+            return np.zeros(0, dtype=np.float32)
+        if self.quantized:
+            return (self.vectors @ query_vector) * self.scales
+        return self.vectors @ query_vector
+
+
+class InProcessVectorIndex(RAGInterface):
+    """
+    RAG backend that keeps chunk vectors in memory and searches them with NumPy.
+
+    Each write of a collection is a new generation `index_dir/<collection>/g<n>/` holding
+    `vectors.npy` (row normalized, float32 or int8 quantized with `scales.npy`) and
+    `chunks.json`; the `CURRENT` file names the live one and is swapped atomically once
+    the generation is complete, so readers never see a partial or empty collection. The
+    matrices are memory mapped, so a worker only pages in what it reads and several
+    workers share the page cache. Workers look for a newer generation at most every
+    INPROCESS_INDEX_REFRESH_SECONDS, and so pick up writes made by the others. Queries are embedded with the same EmbeddingService as the weaviate
+    backend and ranked by cosine distance (1 - cosine similarity), like weaviate does.
+    """
+
+    def __init__(self, embedding_service: EmbeddingService, index_dir: str = None, quantize: bool = None):
+        load_dotenv()
+        self.embedding_service = embedding_service
+        self.index_dir = index_dir or os.getenv("INPROCESS_INDEX_DIR", ".cache/vector_index")
+        self.quantize = quantize if quantize is not None else os.getenv("INPROCESS_INDEX_QUANTIZE", "false").lower() == "true"
+        self.refresh_seconds = float(os.getenv("INPROCESS_INDEX_REFRESH_SECONDS", "1"))
+        self.retrieval_cache = None
+        self._collections: Dict[str, IndexedCollection] = {}
+        self._lock = threading.Lock()
+        self.connect()
+
+    def connect(self) -> None:
+        os.makedirs(self.index_dir, exist_ok=True)
+        print(f"In-process vector index at {self.index_dir}")
+
+    def disconnect(self) -> None:
+        with self._lock:
+            self._collections = {}
+        if self.embedding_service is not None:
+            self.embedding_service.close()
+
+    def is_healthy(self) -> bool:
+        return os.path.isdir(self.index_dir)
+
+    def post_chunk(self, collection: str, data: List[Dict[str, Any]]) -> List[Any]:
+        """Embed and append chunks to a collection"""
+        if not data:
+            return []
+        new_chunks, new_matrix = self._embed(data)
+
+        with self._lock:
+            current = self._load(collection)
+            chunks = (current.chunks if current else []) + new_chunks
+            matrix = np.vstack([self._float_rows(current), new_matrix]) if current and len(current.chunks) else new_matrix
+            self._write(collection, chunks, matrix)
+
+        bump_collection_version(collection)
+        print(len(chunks), " Entries added in the ", collection, " collection")
+        return new_chunks
+
+    def replace_collection(self, collection: str, data: List[Dict[str, Any]]) -> int:
+        """Rebuild a collection from scratch, used for seeding; readers keep the old one until it is written"""
+        chunks, matrix = self._embed(data) if data else ([], np.zeros((0, 0), dtype=np.float32))
+        with self._lock:
+            self._write(collection, chunks, matrix)
+        bump_collection_version(collection)
+        print(len(chunks), " Entries indexed in the ", collection, " collection")
+        return len(data)
+
+    def add_PDF(self, collection: str, data: List[Any]) -> List[Any]:
+        return []
+
+    def get_top_k_chunks(self, collection: str, query: str, top_k: int, is_simple: bool = False, max_distance: float = 1.0, vector: List[float] = None) -> List[Any]:
+        index = self._get(collection)
+        if index is None or len(index.chunks) == 0:
+            return []
+
+        if vector is None:
+            vector = self.embedding_service.embed(query)
+        query_vector = self._normalize_rows(np.asarray(vector, dtype=np.float32)[None, :])[0]
+
+        distances = 1.0 - index.similarities(query_vector)
+        candidates = np.flatnonzero(distances <= max_distance)
+        if candidates.size > top_k:
+            candidates = candidates[np.argpartition(distances[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(distances[candidates])]
+
+        if is_simple:
+            return [index.chunks[position]["properties"]["document"] for position in candidates]
+        return [
+            {**index.chunks[position], "metadata": {"distance": float(distances[position])}}
+            for position in candidates
+        ]
+
+    def get_all_chunks(self, collection: str, limit: int = 10, page: int = 1) -> List[Any]:
+        index = self._get(collection)
+        if index is None:
+            return []
+        return index.chunks[(page - 1) * limit:page * limit]
+
+    def get_chunks_by_ids(self, collection: str, ids: List[str]) -> List[Any]:
+        index = self._get(collection)
+        if index is None:
+            return []
+        return [index.chunks[index.ids[chunk_id]] for chunk_id in ids if chunk_id in index.ids]
+
+    def get_collection_names(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.index_dir) if self._live_directory(name) is not None)
+
+    def delete_chunks_by_id(self, collection: str, ids: List[str]) -> List[Any]:
+        with self._lock:
+            current = self._load(collection)
+            if current is None:
+                return []
+            deleted = set(ids)
+            keep = [position for position, chunk in enumerate(current.chunks) if chunk["uuid"] not in deleted]
+            self._write(collection, [current.chunks[position] for position in keep], self._float_rows(current)[keep])
+        bump_collection_version(collection)
+        return ids
+
+    def get_number_of_chunks(self, collection: str) -> Any:
+        index = self._get(collection)
+        return len(index.chunks) if index is not None else 0
+
+    def _embed(self, data: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """New chunks and their normalized vectors"""
+        vectors = self.embedding_service.embed_many([row["document"] for row in data])
+        chunks = [{"uuid": str(uuid.uuid4()), "properties": dict(row)} for row in data]
+        return chunks, self._normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+    def _get(self, collection: str) -> Optional[IndexedCollection]:
+        index = self._collections.get(collection)
+        if index is not None and time.monotonic() - index.checked_at < self.refresh_seconds:
+            return index
+        with self._lock:
+            return self._load(collection)
+
+    def _live_directory(self, collection: str) -> Optional[str]:
+        """Directory of the live generation of a collection, None when there is none"""
+        directory = os.path.join(self.index_dir, collection)
+        try:
+            with open(os.path.join(directory, "CURRENT"), encoding="utf-8") as current:
+                return os.path.join(directory, current.read().strip())
+        except FileNotFoundError:
+            pass
+        # collections written before generations keep their files in the directory itself
+        return directory if os.path.isfile(os.path.join(directory, "chunks.json")) else None
+
+    def _load(self, collection: str) -> Optional[IndexedCollection]:
+        """Load (memory map) the live generation of a collection unless it is loaded already, caller holds the lock"""
+        cached = self._collections.get(collection)
+        live = self._live_directory(collection)
+        if live is None:
+            self._collections.pop(collection, None)
+            return None
+        try:
+            source = (live, os.stat(os.path.join(live, "chunks.json")).st_mtime_ns)
+            if cached is not None and cached.source == source:
+                cached.checked_at = time.monotonic()
+                return cached
+
+            with open(os.path.join(live, "chunks.json"), encoding="utf-8") as chunks_file:
+                chunks = json.load(chunks_file)
+            vectors = np.load(os.path.join(live, "vectors.npy"), mmap_mode="r")
+            scales_path = os.path.join(live, "scales.npy")
+            scales = np.load(scales_path, mmap_mode="r") if vectors.dtype == np.int8 and os.path.isfile(scales_path) else None
+        except FileNotFoundError:
+            # pruned by another worker between reading CURRENT and opening it, the next check loads the newer one
+            return cached
+
+        index = IndexedCollection(chunks, vectors, scales)
+        index.source = source
+        index.checked_at = time.monotonic()
+        self._collections[collection] = index
+        return index
+
+    def _write(self, collection: str, chunks: List[Dict[str, Any]], matrix: np.ndarray) -> None:
+        """Persist a collection as a new generation, switch CURRENT to it and reload it, caller holds the lock"""
+        directory = os.path.join(self.index_dir, collection)
+        generation = f"g{time.time_ns()}"
+        target = os.path.join(directory, generation)
+        os.makedirs(target)
+
+        scales = None
+        if self.quantize and len(chunks):
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            matrix = np.round(matrix / scales[:, None]).astype(np.int8)
+
+        try:
+            np.save(os.path.join(target, "vectors.npy"), matrix)
+            if scales is not None:
+                np.save(os.path.join(target, "scales.npy"), scales.astype(np.float32))
+            with open(os.path.join(target, "chunks.json"), "w", encoding="utf-8") as chunks_file:
+                json.dump(chunks, chunks_file, ensure_ascii=False)
+        except BaseException:
+            shutil.rmtree(target, ignore_errors=True)
+            raise
+        self._replace_file(os.path.join(directory, "CURRENT"), lambda out: out.write(generation.encode("utf-8")))
+        self._prune_generations(directory)
+
+        self._collections.pop(collection, None)
+        self._load(collection)
+
+    @staticmethod
+    def _prune_generations(directory: str, keep: int = 2) -> None:
+        """Delete all but the newest generations; workers still mapping an old one keep reading it"""
+        generations = sorted(
+            (name for name in os.listdir(directory) if name.startswith("g") and os.path.isdir(os.path.join(directory, name))),
+            key=lambda name: int(name[1:]) if name[1:].isdigit() else 0,
+        )
+        for name in generations[:-keep]:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        # files of the layout before generations
+        for name in ("chunks.json", "vectors.npy", "scales.npy"):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                os.remove(path)
+
+    @staticmethod
+    def _float_rows(index: IndexedCollection) -> np.ndarray:
+        if index.quantized:
+            return np.asarray(index.vectors, dtype=np.float32) * np.asarray(index.scales)[:, None]
+        return np.asarray(index.vectors, dtype=np.float32)
+
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    @staticmethod
+    def _replace_file(path: str, write) -> None:
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as out:
+            write(out)
+        os.replace(temp_path, path)
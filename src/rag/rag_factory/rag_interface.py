@@ -24,8 +24,8 @@ class RAGInterface(ABC):
         pass
     
     @abstractmethod
-    def get_top_k_chunks(self, collection: str, query: str, top_k: int, is_simple: bool = False, max_distance: float = 1.0) -> List[Any]:
-        """Get a response from the RAG"""
+    def get_top_k_chunks(self, collection: str, query: str, top_k: int, is_simple: bool = False, max_distance: float = 1.0, vector: List[float] = None) -> List[Any]:
+        """Get a response from the RAG, `vector` is the query embedding when it is already known"""
         pass
     
     @abstractmethod
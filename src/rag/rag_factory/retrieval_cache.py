@@ -0,0 +1,101 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from src.rag.rag_factory.collection_versions import get_collection_version
+
+_MISSING = object()
+
+
+def normalize_query(query: str) -> str:
+    """Lower case, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"\s+", " ", query).strip().lower().rstrip("?!. ")
+
+
+class RetrievalCache:
+    """
+    LRU + TTL cache for top k retrieval results.
+
+    Entries are keyed by (collection, collection version, normalized query, k,
+    max_distance, is_simple). The version is shared by the workers (see
+    collection_versions), so a write to the collection in any worker moves every worker
+    to new keys; entries of older versions are never read again and age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["RetrievalCache"]:
+        """Build the cache from RETRIEVAL_CACHE_* env vars, None when disabled"""
+        load_dotenv()
+        if os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() != "true":
+            return None
+        return cls(
+            max_entries=int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "2048")),
+            ttl_seconds=float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "3600")),
+        )
+
+    @staticmethod
+    def make_key(collection: str, query: str, top_k: int, max_distance: float, is_simple: bool) -> Tuple:
+        return (collection, get_collection_version(collection), normalize_query(query), top_k, max_distance, is_simple)
+
+    def get(self, key: Tuple) -> Any:
+        """Return the cached chunks or `None` on a miss"""
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return None
+
+            expires_at, chunks = value
+            if expires_at < time.time():
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(chunks)
+
+    def put(self, key: Tuple, chunks: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, list(chunks))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, collection: str) -> None:
+        """Drop every entry of a collection"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == collection]:
+                del self._entries[key]
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
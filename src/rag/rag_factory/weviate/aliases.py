@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import weaviate.classes as wvc
+from dotenv import load_dotenv
+from weaviate import WeaviateClient
+from weaviate.util import generate_uuid5
+
+# weaviate 1.26 has no collection aliases, a pointer object per alias lives in this collection
+ALIAS_COLLECTION = "CollectionAlias"
+
+alias_schema = [
+    wvc.config.Property(name="alias", data_type=wvc.config.DataType.TEXT),
+    wvc.config.Property(name="target", data_type=wvc.config.DataType.TEXT),
+    wvc.config.Property(name="previous", data_type=wvc.config.DataType.TEXT),
+    wvc.config.Property(name="updated_at", data_type=wvc.config.DataType.TEXT),
+]
+
+
+def get_alias(instance: WeaviateClient, alias: str) -> Optional[Dict[str, str]]:
+    """The pointer of an alias (target, previous, updated_at), None when the name is not an alias"""
+    if not instance.collections.exists(ALIAS_COLLECTION):
+        return None
+    pointer = instance.collections.get(ALIAS_COLLECTION).query.fetch_object_by_id(generate_uuid5(alias))
+    return dict(pointer.properties) if pointer is not None else None
+
+
+def set_alias(instance: WeaviateClient, alias: str, target: str, previous: str = "") -> Dict[str, str]:
+    """
+    Point `alias` at the collection `target`. The pointer is a single object, so readers
+    see either the old or the new target, never a mix.
+    """
+    if not instance.collections.exists(ALIAS_COLLECTION):
+        instance.collections.create(
+            name=ALIAS_COLLECTION,
+            vectorizer_config=wvc.config.Configure.Vectorizer.none(),
+            properties=alias_schema
+        )
+    aliases = instance.collections.get(ALIAS_COLLECTION)
+    properties = {"alias": alias, "target": target, "previous": previous, "updated_at": datetime.now().isoformat() + "Z"}
+    uuid = generate_uuid5(alias)
+    if aliases.data.exists(uuid):
+        aliases.data.replace(uuid=uuid, properties=properties)
+    else:
+        aliases.data.insert(properties=properties, uuid=uuid)
+    print(f"Alias {alias} now points to {target} (previously {previous or alias})")
+    return properties
+
+
+class AliasResolver:
+    """
+    Resolves the collection names used by the app (e.g. PIHR_DATASET) to the versioned
+    collection their alias points at, the name itself when it is not an alias.
+
+    Lookups are cached for `ttl_seconds` per worker, so a switch made by a reindex in
+    another process is picked up within that time; `on_switch(alias)` is called when a
+    worker notices its alias moved, to drop caches built on the old collection.
+    """
+
+    def __init__(self, ttl_seconds: float = None, on_switch: Callable[[str], None] = None):
+        load_dotenv()
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("WEAVIATE_ALIAS_TTL_SECONDS", "10"))
+        self.on_switch = on_switch
+        self._targets: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, instance: WeaviateClient, name: str) -> str:
+        with self._lock:
+            cached = self._targets.get(name)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        try:
+            pointer = get_alias(instance, name)
+        except Exception as e:
+            if cached is not None:
+                # keep serving the last known target while weaviate is flaky
+                print(f"Failed to resolve alias {name}: {e}")
+                return cached[1]
+            raise
+        target = pointer["target"] if pointer else name
+        with self._lock:
+            self._targets[name] = (time.monotonic() + self.ttl_seconds, target)
+        if cached is not None and cached[1] != target and self.on_switch is not None:
+            self.on_switch(name)
+        return target
+
+    def forget(self, name: str) -> None:
+        """Resolve `name` again on next use, after this worker switched it"""
+        with self._lock:
+            self._targets.pop(name, None)
@@ -1,10 +1,11 @@
 from weaviate.collections.classes.filters import FilterById
 from weaviate.client import WeaviateClient
 from typing import List
+from src.metrics.metrics import timed_weaviate
 
+@timed_weaviate("delete_chunks_by_id")
 def delete_chunks_by_id(name : str, ids: List[str], instance: WeaviateClient):
     collection = instance.collections.get(name)
     collection.data.delete_many(
         where=FilterById().contains_any(ids)
-    )
-    instance.close()
\ No newline at end of file
+    )
\ No newline at end of file
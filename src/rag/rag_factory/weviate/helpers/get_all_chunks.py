@@ -1,5 +1,7 @@
 from weaviate import WeaviateClient
+from src.metrics.metrics import timed_weaviate
 
+@timed_weaviate("get_all_chunks")
 def get_chunks(collection_name: str, instance: WeaviateClient, limit: int = 10, page: int = 1):
     """
     Retrieves all chunks from a given Weaviate collection.
@@ -1,6 +1,8 @@
 from weaviate import WeaviateClient
 from typing import List
+from src.metrics.metrics import timed_weaviate
 
+@timed_weaviate("get_chunks_by_ids")
 def get_chunks_by_id(collection_name: str, ids: List[str], instance: WeaviateClient):    
     collection = instance.collections.get(collection_name)
     chunks = collection.query.fetch_objects_by_ids(ids=ids).objects    
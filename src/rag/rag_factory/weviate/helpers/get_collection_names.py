@@ -1,5 +1,7 @@
 from weaviate.client import WeaviateClient
+from src.metrics.metrics import timed_weaviate
 
+@timed_weaviate("get_collection_names")
 def get_collection_names(instance: WeaviateClient):    
     see_all_collections = instance.collections.list_all(simple=False)    
     collections = []
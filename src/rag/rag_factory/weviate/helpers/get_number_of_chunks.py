@@ -1,5 +1,7 @@
 from weaviate import WeaviateClient
+from src.metrics.metrics import timed_weaviate
 
+@timed_weaviate("get_number_of_chunks")
 def get_chunks_count(collection_name: str, instance: WeaviateClient):
     """
     Retrieves all chunks from a given Weaviate collection.
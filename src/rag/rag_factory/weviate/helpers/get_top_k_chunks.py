@@ -1,13 +1,20 @@
+from typing import List
 from weaviate import WeaviateClient
 from weaviate.collections.classes.grpc import MetadataQuery
+from src.metrics.metrics import timed_weaviate
 
 
-def get_top_k_chunks(collection_name: str, query: str, instance: WeaviateClient, k: int = 3, is_simple: bool = False, max_distance: float = 1.0):
+@timed_weaviate("get_top_k_chunks")
+def get_top_k_chunks(collection_name: str, query: str, instance: WeaviateClient, k: int = 3, is_simple: bool = False, max_distance: float = 1.0, vector: List[float] = None):
     include_distance = False
     if is_simple is False:
         include_distance = True
     collection = instance.collections.get(collection_name)
-    chunks = collection.query.near_text(query, limit=k, distance=max_distance, return_metadata=MetadataQuery(distance=include_distance)).objects
+    if vector is not None:
+        # query embedded by the app, weaviate does not have to call openai
+        chunks = collection.query.near_vector(vector, limit=k, distance=max_distance, return_metadata=MetadataQuery(distance=include_distance)).objects
+    else:
+        chunks = collection.query.near_text(query, limit=k, distance=max_distance, return_metadata=MetadataQuery(distance=include_distance)).objects
     
     if is_simple:
         chunks = [chunk.properties["document"] for chunk in chunks]
@@ -0,0 +1,22 @@
+from typing import Optional
+from weaviate import WeaviateClient
+from src.metrics.metrics import timed_weaviate
+
+@timed_weaviate("get_vectorizer_model")
+def get_vectorizer_model(collection_name: str, instance: WeaviateClient) -> Optional[str]:
+    """
+    The OpenAI embedding model a collection vectorizes its objects with, None when it is
+    not text2vec-openai or the model can't be read from its config.
+
+    Collections created without a model carry the module defaults (model "ada",
+    modelVersion "002"), reported as text-embedding-ada-002.
+    """
+    config = instance.collections.get(collection_name).config.get()
+    vectorizer = config.vectorizer_config
+    if vectorizer is None or "openai" not in str(vectorizer.vectorizer):
+        return None
+    settings = vectorizer.model or {}
+    model = settings.get("model")
+    if model == "ada":
+        return f"text-embedding-ada-{settings.get('modelVersion') or '002'}"
+    return model
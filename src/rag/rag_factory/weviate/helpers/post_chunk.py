@@ -1,6 +1,8 @@
 from weaviate import WeaviateClient
 from typing import List, Dict
+from src.metrics.metrics import timed_weaviate
 
+@timed_weaviate("post_chunk")
 def post_chunk(collection_name: str, data_rows: List[Dict[str, str]], instance: WeaviateClient):
     chunks = instance.collections.get(collection_name)
     with chunks.batch.dynamic() as batch:
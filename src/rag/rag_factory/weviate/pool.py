@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+import weaviate
+from weaviate import WeaviateClient
+from dotenv import load_dotenv
+
+from src.metrics.metrics import observe_stage
+
+
+def create_client() -> WeaviateClient:
+    """Open a new connection to the weaviate container"""
+    load_dotenv()
+    return weaviate.connect_to_local(
+        host=os.getenv("WEAVIATE_HOST", "weaviate"),
+        port=int(os.getenv("WEAVIATE_PORT", "8080")),
+        grpc_port=int(os.getenv("WEAVIATE_GRPC_PORT", "50051")),
+        headers={
+            "X-OpenAI-Api-Key": os.environ["OPENAI_API_KEY"]
+        })
+
+
+class WeaviateClientPool:
+    """
+    A small pool of long lived weaviate clients shared by the whole worker.
+
+    Clients are opened once (at application startup) and handed out with `acquire()`.
+    A client that has not been used for `health_check_interval` seconds is pinged before
+    it is returned and transparently reconnected if the ping fails.
+    """
+
+    def __init__(self, size: int = None, health_check_interval: float = None, acquire_timeout: float = None):
+        load_dotenv()
+        self.size = size or int(os.getenv("WEAVIATE_POOL_SIZE", "4"))
+        self.health_check_interval = health_check_interval if health_check_interval is not None else float(os.getenv("WEAVIATE_HEALTH_CHECK_INTERVAL", "30"))
+        self.acquire_timeout = acquire_timeout if acquire_timeout is not None else float(os.getenv("WEAVIATE_ACQUIRE_TIMEOUT", "10"))
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        self._clients: List[WeaviateClient] = []
+        self._last_checked = {}
+        self._lock = threading.Lock()
+        self._closed = True
+
+    def open(self) -> None:
+        """Open every client of the pool"""
+        with self._lock:
+            if not self._closed:
+                return
+            for _ in range(self.size):
+                client = create_client()
+                self._clients.append(client)
+                self._last_checked[id(client)] = time.monotonic()
+                self._idle.put(client)
+            self._closed = False
+        print(f"Weaviate pool opened with {self.size} clients")
+
+    def close(self) -> None:
+        """Close every client of the pool"""
+        with self._lock:
+            for client in self._clients:
+                try:
+                    client.close()
+                except Exception as e:
+                    print(f"Failed to close weaviate client: {e}")
+            self._clients = []
+            self._last_checked = {}
+            self._idle = queue.LifoQueue(maxsize=self.size)
+            self._closed = True
+        print("Weaviate pool closed")
+
+    @property
+    def is_open(self) -> bool:
+        return not self._closed
+
+    def is_healthy(self) -> bool:
+        """Ping weaviate with one of the idle clients"""
+        try:
+            with self.acquire() as client:
+                return client.is_ready()
+        except Exception:
+            return False
+
+    @contextmanager
+    def acquire(self) -> Iterator[WeaviateClient]:
+        """Borrow a healthy client from the pool for the duration of the `with` block"""
+        if self._closed:
+            raise Exception("Weaviate is not running")
+        started = time.perf_counter()
+        try:
+            client = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise Exception("Timed out waiting for a free weaviate client")
+
+        try:
+            client = self._ensure_healthy(client)
+        except Exception:
+            self._idle.put(client)
+            raise
+        observe_stage("weaviate_connect", time.perf_counter() - started)
+
+        try:
+            yield client
+        finally:
+            self._idle.put(client)
+
+    def _ensure_healthy(self, client: WeaviateClient) -> WeaviateClient:
+        now = time.monotonic()
+        if now - self._last_checked.get(id(client), 0) < self.health_check_interval:
+            return client
+
+        try:
+            healthy = client.is_connected() and client.is_ready()
+        except Exception:
+            healthy = False
+
+        if healthy:
+            self._last_checked[id(client)] = now
+            return client
+
+        print("Weaviate client is unhealthy, reconnecting")
+        return self._reconnect(client)
+
+    def _reconnect(self, client: WeaviateClient) -> WeaviateClient:
+        try:
+            client.close()
+        except Exception:
+            pass
+        fresh = create_client()
+        with self._lock:
+            self._clients = [fresh if c is client else c for c in self._clients]
+            self._last_checked.pop(id(client), None)
+            self._last_checked[id(fresh)] = time.monotonic()
+        return fresh
@@ -1,33 +1,22 @@
-import weaviate
 import weaviate.classes as wvc
 import os
 from dotenv import load_dotenv
-from weaviate.collections.classes.filters import FilterById
+from src.rag.rag_factory.weviate.pool import create_client
+from src.rag.rag_factory.weviate.seed.dbOps.row_hash import content_hash_property
 
 load_dotenv()
 
-def create_connection():
-    client = weaviate.connect_to_local(
-        host="weaviate",
-        port=8080,
-        grpc_port=50051,
-        headers={
-            "X-OpenAI-Api-Key": os.environ["OPENAI_API_KEY"]  # Replace with your inference API key
-        }
-    )
-    return client
-
 def create_collection(name, properties):
+    client = create_client()
     try:
-        client = create_connection()
-                
         if client.collections.exists(name):
             print(f"Collection {name} already exists")
         else:
             print(f"Creating collection {name}...")
             client.collections.create(
                 name=name,
-                vectorizer_config=wvc.config.Configure.Vectorizer.text2vec_openai(),
+                # must match the model the app embeds queries with for near_vector search
+                vectorizer_config=wvc.config.Configure.Vectorizer.text2vec_openai(model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")),
                 generative_config=wvc.config.Configure.Generative.openai(),
                 properties=properties
             )
@@ -48,7 +37,8 @@ pihr_schema = [
     wvc.config.Property(
         name="tag",
         data_type=wvc.config.DataType.TEXT_ARRAY,
-    )
+    ),
+    content_hash_property
 ]
 
 if __name__ == "__main__":
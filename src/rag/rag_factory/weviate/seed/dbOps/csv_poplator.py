@@ -1,56 +1,32 @@
-import weaviate
-import weaviate.classes as wvc
-import os
+import csv
+from typing import Any, Dict, Iterator, List
 from dotenv import load_dotenv
-from weaviate.collections.classes.filters import FilterById
+from src.rag.rag_factory.weviate.seed.dbOps.row_hash import seed_object
+from src.rag.rag_factory.weviate.seed.dbOps.ingest import ingest_objects
 
 load_dotenv()
 
-def create_connection():
-    client = weaviate.connect_to_local(
-        host="weaviate",
-        port=8080,
-        grpc_port=50051,
-        headers={
-            "X-OpenAI-Api-Key": os.environ["OPENAI_API_KEY"]  # Replace with your inference API key
-        }
-    )
-    return client
+def populate_collection(name, data_rows, key_column=None, checkpoint=None, batch_size=None, concurrency=None):
+    """Stream csv rows into a collection, see ingest_objects; `data_rows` may be a lazy iterator"""
+    # deterministic uuids and content hashes, so later seeds can be incremental and resumed
+    objects = (seed_object(data_row, key_column) for data_row in data_rows)
+    return ingest_objects(name, objects, batch_size=batch_size, concurrency=concurrency, checkpoint=checkpoint)
 
-def populate_collection(name, data_rows):
-    client = create_connection()
-    chunks = client.collections.get(name)    
-    with chunks.batch.dynamic() as batch:
-        for data_row in data_rows:
-            print(">>>> Adding ", data_row)
-            batch.add_object(
-                properties=data_row,
-            )
-    print(len(chunks) , " Entries added in the ", name, " collection")
-    client.close()
+def iter_data_rows(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Rows of a knowledge base csv, read one at a time"""
+    with open(file_path, mode="r", encoding="utf-8") as csvfile:
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            row["tag"] = row["tag"].split(",") if "tag" in row and row["tag"] else []
+            yield row
     
-    return
-    
-def get_data_rows(file_path : str):
-    import csv
-    from typing import List, Dict    
-
-    def import_data_from_csv(csv_file_path: str) -> List[Dict[str, str]]:
-        print("Processing CSV file...")
-        data_rows = []
-        with open(csv_file_path, mode="r", encoding="utf-8") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                row["tag"] = row["tag"].split(",") if "tag" in row and row["tag"] else []
-                data_rows.append(row)
-        print(len(data_rows), " rows processed")
-        return data_rows
-    
-    # csv_file_path = "/Users/codermehraj/Documents/codes/vivasoft/auto-query/pihr-autoquery/kb/PIHR_DATASET.csv"
+def get_data_rows(file_path : str) -> List[Dict[str, Any]]:
+    """All rows of a knowledge base csv, for callers that need them at once"""
+    print("Processing CSV file...")
     # csv_file_path = "kb/PIHR_DATASET.csv"
-    data_rows = import_data_from_csv(file_path)
-    
+    data_rows = list(iter_data_rows(file_path))
+    print(len(data_rows), " rows processed")
     return data_rows
 
 if __name__ == "__main__":
-    populate_collection("PIHR_DATASET", get_data_rows())
\ No newline at end of file
+    populate_collection("PIHR_DATASET", iter_data_rows("kb/PIHR_DATASET.csv"))
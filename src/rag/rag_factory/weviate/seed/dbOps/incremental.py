@@ -0,0 +1,127 @@
+import argparse
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+
+from weaviate import WeaviateClient
+from weaviate.classes.query import Filter
+
+from src.jobs.jobs import report_progress
+from src.rag.rag_factory.collection_versions import bump_collection_version
+from src.rag.rag_factory.weviate.pool import create_client
+from src.rag.rag_factory.weviate.seed.dbOps.create_collection import create_collection, pihr_schema
+from src.rag.rag_factory.weviate.seed.dbOps.csv_poplator import iter_data_rows
+from src.rag.rag_factory.weviate.seed.dbOps.ingest import SeedObject, ingest_objects
+from src.rag.rag_factory.weviate.seed.dbOps.reindex import current_target
+from src.rag.rag_factory.weviate.seed.dbOps.row_hash import CONTENT_HASH, ensure_content_hash_property, seed_object
+
+DELETE_BATCH_SIZE = 500
+
+
+def existing_hashes(instance: WeaviateClient, collection_name: str) -> Dict[str, str]:
+    """uuid -> content_hash of every object, without fetching vectors; objects seeded before hashing have ""."""
+    collection = instance.collections.get(collection_name)
+    return {
+        str(chunk.uuid): chunk.properties.get(CONTENT_HASH) or ""
+        for chunk in collection.iterator(include_vector=False, return_properties=[CONTENT_HASH])
+    }
+
+
+def plan_changes(data_rows: Iterable[Dict[str, Any]], existing: Dict[str, str], key_column: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Diff the csv against the collection: rows whose uuid is new are inserted, rows whose
+    uuid exists with another content hash are updated, objects whose uuid is not in the
+    csv are deleted and the rest are skipped. Only inserts and updates get embedded.
+
+    Only uuids and hashes are kept, the rows to write are read again by changed_objects.
+    """
+    desired: Dict[str, str] = {}
+    rows = 0
+    for data_row in data_rows:
+        uuid, properties = seed_object(data_row, key_column)
+        # a duplicated row is one object, the last one wins
+        desired[uuid] = properties[CONTENT_HASH]
+        rows += 1
+
+    inserts, updates, skipped = [], [], 0
+    for uuid, digest in desired.items():
+        if uuid not in existing:
+            inserts.append(uuid)
+        elif existing[uuid] != digest:
+            updates.append(uuid)
+        else:
+            skipped += 1
+    deletes = [uuid for uuid in existing if uuid not in desired]
+    return {"inserts": inserts, "updates": updates, "deletes": deletes, "skipped": skipped, "duplicates": rows - len(desired),
+            "hashes": {uuid: desired[uuid] for uuid in inserts + updates}}
+
+
+def changed_objects(data_rows: Iterable[Dict[str, Any]], plan: Dict[str, Any], key_column: Optional[str] = None) -> Iterator[SeedObject]:
+    """The objects to insert or update, in csv order, each once"""
+    pending: Set[str] = set(plan["hashes"])
+    for data_row in data_rows:
+        uuid, properties = seed_object(data_row, key_column)
+        # the row the plan hashed, not an earlier duplicate of it
+        if uuid in pending and plan["hashes"][uuid] == properties[CONTENT_HASH]:
+            pending.discard(uuid)
+            yield uuid, properties
+
+
+def sync_collection(file_path: str, collection_name: str = "PIHR_DATASET", key_column: Optional[str] = None, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Incremental reseed of the collection `collection_name` reads from (its alias target):
+    only new and changed rows are sent to weaviate, and so to the embedding model. A
+    reseed of an unchanged csv writes nothing.
+    """
+    started = time.perf_counter()
+    instance = create_client()
+    try:
+        target = current_target(instance, collection_name)
+        if not target:
+            target = collection_name
+            create_collection(target, pihr_schema)
+        collection = instance.collections.get(target)
+        ensure_content_hash_property(collection)
+
+        report_progress(stage="plan", collection=target)
+        plan = plan_changes(iter_data_rows(file_path), existing_hashes(instance, target), key_column)
+        report_progress(inserts=len(plan["inserts"]), updates=len(plan["updates"]), deletes=len(plan["deletes"]), skipped=plan["skipped"])
+        failed, errors = 0, []
+        if not dry_run:
+            if plan["hashes"]:
+                # an object inserted with an existing uuid replaces it; no checkpoint, a
+                # rerun after an interruption only plans what is still missing
+                ingest = ingest_objects(target, changed_objects(iter_data_rows(file_path), plan, key_column))
+                failed, errors = ingest["failed"], ingest["errors"]
+            report_progress(stage="delete")
+            for start in range(0, len(plan["deletes"]), DELETE_BATCH_SIZE):
+                collection.data.delete_many(where=Filter.by_id().contains_any(plan["deletes"][start:start + DELETE_BATCH_SIZE]))
+    finally:
+        instance.close()
+
+    counts = {
+        "collection": target,
+        "inserted": len(plan["inserts"]),
+        "updated": len(plan["updates"]),
+        "deleted": len(plan["deletes"]),
+        "skipped": plan["skipped"],
+        "duplicates": plan["duplicates"],
+        "failed": failed,
+        "errors": errors,
+        "dry_run": dry_run,
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+    if not dry_run and (plan["inserts"] or plan["updates"] or plan["deletes"]):
+        bump_collection_version(collection_name)
+    print(f"Incremental seed of {collection_name}: {counts}")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the changes of a knowledge base csv to its RAG collection")
+    parser.add_argument("--file", default="kb/PIHR_DATASET.csv")
+    parser.add_argument("--collection", default="PIHR_DATASET")
+    parser.add_argument("--key-column", default=None, help="csv column identifying a row across edits, the content hash otherwise")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    args = parser.parse_args()
+
+    sync_collection(args.file, args.collection, key_column=args.key_column, dry_run=args.dry_run)
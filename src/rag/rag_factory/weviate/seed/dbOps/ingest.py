@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from weaviate.classes.data import DataObject
+
+from src.jobs.jobs import report_progress
+from src.rag.rag_factory.weviate.pool import WeaviateClientPool
+
+# errors kept in the report, the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+SeedObject = Tuple[str, Dict[str, Any]]
+
+
+def ingest_settings() -> Dict[str, Any]:
+    load_dotenv()
+    return {
+        "batch_size": int(os.getenv("SEED_BATCH_SIZE", "200")),
+        "concurrency": int(os.getenv("SEED_CONCURRENCY", "2")),
+        "max_attempts": int(os.getenv("SEED_MAX_ATTEMPTS", "3")),
+    }
+
+
+def file_fingerprint(file_path: str) -> str:
+    """sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as source:
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    """
+    Progress of a seed on local disk: how many rows of which csv have been written to
+    which collection. Objects have deterministic uuids, so rows written after the last
+    save are simply written again on resume.
+    """
+
+    def __init__(self, name: str, fingerprint: str, directory: str = None):
+        load_dotenv()
+        directory = directory or os.getenv("SEED_CHECKPOINT_DIR", ".cache/seed_checkpoints")
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{name}.json")
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def for_seed(cls, name: str, file_path: str) -> "Checkpoint":
+        return cls(name, file_fingerprint(file_path))
+
+    def load(self) -> Dict[str, Any]:
+        """The saved state, empty when there is none or it was made from another csv"""
+        try:
+            with open(self.path, encoding="utf-8") as source:
+                state = json.load(source)
+        except (OSError, ValueError):
+            return {}
+        return state if state.get("fingerprint") == self.fingerprint else {}
+
+    def save(self, **state) -> None:
+        temporary = self.path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as target:
+            json.dump({**state, "fingerprint": self.fingerprint, "saved_at": time.time()}, target)
+        os.replace(temporary, self.path)
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class IngestError(Exception):
+    """A batch kept failing, the seed stopped after saving its checkpoint"""
+
+    def __init__(self, message: str, report: Dict[str, Any]):
+        super().__init__(message)
+        self.report = report
+
+
+def _batches(objects: Iterator[SeedObject], batch_size: int, start: int) -> Iterator[Tuple[int, List[SeedObject]]]:
+    position = start
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return
+        yield position, batch
+        position += len(batch)
+
+
+def ingest_objects(collection_name: str, objects: Iterable[SeedObject], batch_size: int = None, concurrency: int = None,
+                   checkpoint: Optional[Checkpoint] = None, max_attempts: int = None) -> Dict[str, Any]:
+    """
+    Write (uuid, properties) objects to a collection as they are read.
+
+    Objects are sent in batches of `batch_size` with `insert_many`, up to `concurrency`
+    batches at a time, each on its own pooled client. Objects weaviate rejects are
+    collected with their row number and message; a batch failing as a whole is retried
+    `max_attempts` times, after which the seed stops with an IngestError.
+
+    With a `checkpoint`, the number of rows written in order is saved after every batch
+    and a later call with the same csv skips them.
+    """
+    settings = ingest_settings()
+    batch_size = batch_size or settings["batch_size"]
+    concurrency = concurrency or settings["concurrency"]
+    max_attempts = max_attempts or settings["max_attempts"]
+
+    state = checkpoint.load() if checkpoint is not None else {}
+    # progress saved while seeding another collection does not apply here
+    resumed_from = state.get("rows_done", 0) if state.get("collection") == collection_name else 0
+    if resumed_from:
+        print(f"Resuming the seed of {collection_name} after {resumed_from} rows")
+    objects = islice(iter(objects), resumed_from, None)
+
+    started = time.perf_counter()
+    report = {"collection": collection_name, "resumed_from": resumed_from, "rows": 0, "written": 0, "failed": 0, "batches": 0, "errors": []}
+    # rows_done only moves over batches finished in order
+    done_batches: Dict[int, int] = {}
+    rows_done = resumed_from
+    pool = WeaviateClientPool(size=concurrency)
+    pool.open()
+
+    def write(position: int, batch: List[SeedObject]) -> Tuple[int, int, List[Dict[str, Any]]]:
+        for attempt in range(1, max_attempts + 1):
+            try:
+                with pool.acquire() as client:
+                    result = client.collections.get(collection_name).data.insert_many(
+                        [DataObject(properties=properties, uuid=uuid) for uuid, properties in batch]
+                    )
+                errors = [
+                    {"row": position + index, "uuid": batch[index][0], "message": error.message}
+                    for index, error in result.errors.items()
+                ]
+                return position, len(batch), errors
+            except Exception as e:
+                if attempt == max_attempts:
+                    raise
+                print(f"Batch at row {position} failed ({e}), retry {attempt} of {max_attempts - 1}")
+                time.sleep(min(2 ** attempt, 30))
+
+    failure = None
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="seed") as executor:
+            pending = set()
+            batches = _batches(objects, batch_size, resumed_from)
+            while True:
+                # at most two batches per worker are read ahead
+                while failure is None and len(pending) < concurrency * 2:
+                    next_batch = next(batches, None)
+                    if next_batch is None:
+                        break
+                    pending.add(executor.submit(write, *next_batch))
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    try:
+                        position, size, errors = future.result()
+                    except Exception as e:
+                        failure = failure or e
+                        continue
+                    report["batches"] += 1
+                    report["rows"] += size
+                    report["failed"] += len(errors)
+                    report["written"] += size - len(errors)
+                    report["errors"].extend(errors[:MAX_REPORTED_ERRORS - len(report["errors"])])
+                    done_batches[position] = size
+                while rows_done in done_batches:
+                    rows_done += done_batches.pop(rows_done)
+                report_progress(stage="ingest", collection=collection_name, rows_done=rows_done,
+                                written=report["written"], failed=report["failed"])
+                if checkpoint is not None:
+                    checkpoint.save(collection=collection_name, rows_done=rows_done)
+    finally:
+        pool.close()
+
+    seconds = time.perf_counter() - started
+    report.update(rows_done=rows_done, seconds=round(seconds, 2), rows_per_second=round(report["rows"] / seconds, 1) if seconds > 0 else 0)
+    for error in report["errors"][:10]:
+        print(f"Failed to seed row {error['row']}: {error['message']}")
+    if failure is not None:
+        raise IngestError(f"Seeding {collection_name} stopped after {rows_done} rows, run it again to resume: {failure}", report)
+    if checkpoint is not None:
+        checkpoint.clear()
+    print(f"Seeded {report['written']} objects into {collection_name} ({report['failed']} failed) at {report['rows_per_second']} rows/s")
+    return report
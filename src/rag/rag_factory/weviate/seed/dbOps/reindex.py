@@ -0,0 +1,178 @@
+import argparse
+import random
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+from weaviate import WeaviateClient
+
+from src.jobs.jobs import report_progress
+from src.rag.rag_factory.collection_versions import bump_collection_version
+from src.rag.rag_factory.weviate.aliases import get_alias, set_alias
+from src.rag.rag_factory.weviate.pool import create_client
+from src.rag.rag_factory.weviate.seed.dbOps.create_collection import create_collection, pihr_schema
+from src.rag.rag_factory.weviate.seed.dbOps.csv_poplator import populate_collection, iter_data_rows
+from src.rag.rag_factory.weviate.seed.dbOps.ingest import Checkpoint, IngestError
+from src.rag.rag_factory.weviate.seed.dbOps.row_hash import seed_object
+
+
+def version_name(alias: str) -> str:
+    return f"{alias}_v{datetime.now():%Y%m%d%H%M%S}"
+
+
+def collection_versions(instance: WeaviateClient, alias: str) -> List[str]:
+    """The versioned collections built for an alias, oldest first"""
+    pattern = re.compile(rf"{re.escape(alias)}_v\d{{14}}")
+    return sorted(name for name in instance.collections.list_all(simple=True) if pattern.fullmatch(name))
+
+
+def current_target(instance: WeaviateClient, alias: str) -> str:
+    """The collection an alias reads from now, "" when there is none yet"""
+    pointer = get_alias(instance, alias)
+    if pointer is not None:
+        return pointer["target"]
+    # before the first reindex the alias is the plain collection the app used to seed
+    return alias if instance.collections.exists(alias) else ""
+
+
+def validate_collection(instance: WeaviateClient, name: str, data_rows: Iterable[Dict[str, Any]],
+                        sample_size: int = 5, top_k: int = 3, min_ratio: float = 1.0, key_column: str = None) -> Dict[str, Any]:
+    """
+    Check a freshly built collection before it takes traffic: it must hold at least
+    `min_ratio` of the csv rows (duplicated rows are one object), and a random sample
+    of rows searched by their own document must come back in the top `top_k`.
+    """
+    collection = instance.collections.get(name)
+    count = collection.aggregate.over_all(total_count=True).total_count
+    uuids = set()
+    samples: List[Dict[str, Any]] = []
+    for seen, data_row in enumerate(data_rows):
+        uuids.add(seed_object(data_row, key_column)[0])
+        # reservoir sample, the rows are streamed once
+        if len(samples) < sample_size:
+            samples.append(data_row)
+        elif random.randrange(seen + 1) < sample_size:
+            samples[random.randrange(sample_size)] = data_row
+    expected = len(uuids)
+    problems = []
+    if count < expected * min_ratio:
+        problems.append(f"{count} objects for {expected} distinct rows")
+
+    misses = 0
+    for row in samples:
+        found = [chunk.properties.get("document") for chunk in collection.query.near_text(row["document"], limit=top_k).objects]
+        if row["document"] not in found:
+            misses += 1
+    if misses:
+        problems.append(f"{misses} of {len(samples)} sample queries did not find their row")
+
+    return {"collection": name, "count": count, "expected": expected, "samples": len(samples), "sample_misses": misses, "problems": problems}
+
+
+def prune_versions(instance: WeaviateClient, alias: str, keep: int) -> List[str]:
+    """Delete old versions of an alias, never its current or previous target"""
+    pointer = get_alias(instance, alias) or {}
+    protected = {pointer.get("target"), pointer.get("previous")}
+    versions = collection_versions(instance, alias)
+    pruned = [name for name in versions[:max(len(versions) - keep, 0)] if name not in protected]
+    for name in pruned:
+        instance.collections.delete(name)
+        print(f"Deleted old version {name}")
+    return pruned
+
+
+def reindex_collection(file_path: str, alias: str = "PIHR_DATASET", sample_size: int = 5, min_ratio: float = 1.0, keep_versions: int = 2, key_column: str = None) -> Dict[str, Any]:
+    """
+    Blue/green reseed: build a new versioned collection next to the live one, validate
+    it, then point `alias` at it. Chats keep reading the previous version until the
+    switch, and `rollback_collection` points the alias back. A version failing
+    validation is deleted and the alias is left untouched.
+
+    A build stopped by an IngestError keeps its version and checkpoint, and running the
+    reindex again with the same csv resumes it instead of starting a new version.
+    """
+    started = time.perf_counter()
+    if next(iter_data_rows(file_path), None) is None:
+        raise ValueError(f"No rows in {file_path}, {alias} was not switched")
+
+    checkpoint = Checkpoint.for_seed(f"{alias}.reindex", file_path)
+    instance = create_client()
+    try:
+        version = checkpoint.load().get("collection")
+        if not version or not instance.collections.exists(version):
+            checkpoint.clear()
+            version = version_name(alias)
+        try:
+            create_collection(version, pihr_schema)
+            ingest = populate_collection(version, iter_data_rows(file_path), key_column, checkpoint=checkpoint)
+            report_progress(stage="validate", collection=version)
+            report = validate_collection(instance, version, iter_data_rows(file_path), sample_size=sample_size, min_ratio=min_ratio, key_column=key_column)
+        except IngestError:
+            raise
+        except Exception:
+            checkpoint.clear()
+            instance.collections.delete(version)
+            raise
+        if report["problems"]:
+            instance.collections.delete(version)
+            raise ValueError(f"{version} failed validation, {alias} was not switched: {report['problems']}")
+
+        previous = current_target(instance, alias)
+        set_alias(instance, alias, version, previous)
+        pruned = prune_versions(instance, alias, keep_versions)
+    finally:
+        instance.close()
+
+    bump_collection_version(alias)
+    return {**report, "alias": alias, "target": version, "previous": previous, "pruned": pruned, "ingest": ingest, "seconds": round(time.perf_counter() - started, 1)}
+
+
+def rollback_collection(alias: str = "PIHR_DATASET") -> Dict[str, str]:
+    """Point an alias back at its previous collection; rolling back twice rolls forward again"""
+    instance = create_client()
+    try:
+        pointer = get_alias(instance, alias)
+        if pointer is None or not pointer["previous"]:
+            raise ValueError(f"{alias} has no previous version to roll back to")
+        if not instance.collections.exists(pointer["previous"]):
+            raise ValueError(f"Previous version {pointer['previous']} of {alias} no longer exists")
+        properties = set_alias(instance, alias, pointer["previous"], pointer["target"])
+    finally:
+        instance.close()
+
+    bump_collection_version(alias)
+    return properties
+
+
+def alias_status(alias: str = "PIHR_DATASET") -> Dict[str, Any]:
+    instance = create_client()
+    try:
+        return {
+            "alias": alias,
+            "target": current_target(instance, alias),
+            "pointer": get_alias(instance, alias),
+            "versions": collection_versions(instance, alias),
+        }
+    finally:
+        instance.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild a RAG collection as a new version and switch its alias, or roll the alias back")
+    parser.add_argument("--file", default="kb/PIHR_DATASET.csv")
+    parser.add_argument("--collection", default="PIHR_DATASET", help="alias the app reads from")
+    parser.add_argument("--samples", type=int, default=5, help="sample queries run against the new version")
+    parser.add_argument("--min-ratio", type=float, default=1.0, help="objects the new version must hold, as a share of the csv rows")
+    parser.add_argument("--keep", type=int, default=2, help="versions kept after the switch")
+    parser.add_argument("--key-column", default=None, help="csv column identifying a row across edits, see incremental")
+    parser.add_argument("--rollback", action="store_true", help="point the alias back at the previous version")
+    parser.add_argument("--status", action="store_true", help="show the alias and its versions")
+    args = parser.parse_args()
+
+    if args.status:
+        print(alias_status(args.collection))
+    elif args.rollback:
+        print(rollback_collection(args.collection))
+    else:
+        print(reindex_collection(args.file, args.collection, sample_size=args.samples, min_ratio=args.min_ratio, keep_versions=args.keep, key_column=args.key_column))
@@ -0,0 +1,42 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional, Tuple
+
+import weaviate.classes as wvc
+from weaviate.collections import Collection
+from weaviate.util import generate_uuid5
+
+# stored on every seeded object, never embedded
+CONTENT_HASH = "content_hash"
+
+content_hash_property = wvc.config.Property(
+    name=CONTENT_HASH,
+    data_type=wvc.config.DataType.TEXT,
+    skip_vectorization=True,
+    vectorize_property_name=False,
+)
+
+
+def content_hash(properties: Dict[str, Any]) -> str:
+    """Hash of everything weaviate embeds for a row, it changes exactly when the row must be re-embedded"""
+    return hashlib.sha256(json.dumps(properties, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def seed_object(data_row: Dict[str, Any], key_column: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    The deterministic uuid and the properties of a csv row.
+
+    With a `key_column` the uuid comes from that column, so an edited row keeps its
+    object and is updated in place; without one it comes from the content hash, and an
+    edited row is a new object replacing the old one.
+    """
+    properties = {name: value for name, value in data_row.items() if name != key_column}
+    digest = content_hash(properties)
+    uuid = generate_uuid5(f"key:{data_row[key_column]}" if key_column else digest)
+    return uuid, {**properties, CONTENT_HASH: digest}
+
+
+def ensure_content_hash_property(collection: Collection) -> None:
+    """Add content_hash to collections created before it existed, auto schema would embed it"""
+    if not any(prop.name == CONTENT_HASH for prop in collection.config.get().properties):
+        collection.config.add_property(content_hash_property)
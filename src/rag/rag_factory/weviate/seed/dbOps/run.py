@@ -1,8 +1,51 @@
+import os
+from dotenv import load_dotenv
+
 from src.rag.rag_factory.weviate.seed.dbOps.create_collection import create_collection, pihr_schema
 from src.rag.rag_factory.weviate.seed.dbOps.delete_collection import delete_collection
-from src.rag.rag_factory.weviate.seed.dbOps.csv_poplator import populate_collection, get_data_rows
+from src.rag.rag_factory.weviate.seed.dbOps.csv_poplator import populate_collection, iter_data_rows
+from src.rag.rag_factory.weviate.seed.dbOps.ingest import Checkpoint
+from src.rag.rag_factory.weviate.seed.dbOps.reindex import reindex_collection
+from src.rag.rag_factory.weviate.seed.dbOps.incremental import sync_collection
+from src.rag.rag_factory.weviate.aliases import get_alias
+from src.rag.rag_factory.weviate.pool import create_client
+from src.rag.rag_factory.collection_versions import bump_collection_version
+
+SEED_MODES = ("incremental", "reindex", "replace")
+
+def run_seed(file_path: str, collection_name: str = "PIHR_DATASET", mode: str = None, key_column: str = None):
+    """
+    Seed a collection from a csv.
+
+    mode "incremental" (default, RAG_SEED_MODE) inserts, updates and deletes only the
+    rows that changed since the last seed, see sync_collection.
+    mode "reindex" builds a new version next to the live collection and switches its
+    alias once validated, for schema or embedding model changes, see reindex_collection.
+    mode "replace" deletes and rebuilds the collection in place: chats get empty or
+    partial context until it is done. An interrupted replace resumes where it stopped
+    when run again with the same csv.
+    `key_column` (RAG_SEED_KEY_COLUMN) identifies a row across edits, the content hash otherwise.
+    """
+    load_dotenv()
+    mode = (mode or os.getenv("RAG_SEED_MODE", "incremental")).lower()
+    key_column = key_column or os.getenv("RAG_SEED_KEY_COLUMN") or None
+    if mode == "incremental":
+        return sync_collection(file_path, collection_name, key_column=key_column)
+    if mode == "reindex":
+        return reindex_collection(file_path, collection_name, key_column=key_column)
+    if mode not in SEED_MODES:
+        raise ValueError(f"Unknown seed mode: {mode}")
 
-def run_seed(file_path: str, collection_name: str = "PIHR_DATASET"):
-    delete_collection(collection_name)
+    instance = create_client()
+    try:
+        if get_alias(instance, collection_name) is not None:
+            raise ValueError(f"{collection_name} is an alias of a versioned collection, reseed it with mode=reindex")
+    finally:
+        instance.close()
+    checkpoint = Checkpoint.for_seed(f"{collection_name}.replace", file_path)
+    if checkpoint.load().get("collection") != collection_name:
+        delete_collection(collection_name)
     create_collection(collection_name, pihr_schema)
-    populate_collection(collection_name, get_data_rows(file_path))
\ No newline at end of file
+    ingest = populate_collection(collection_name, iter_data_rows(file_path), key_column, checkpoint=checkpoint)
+    bump_collection_version(collection_name)
+    return {"alias": None, "target": collection_name, "ingest": ingest}
@@ -1,8 +1,6 @@
 from src.rag.rag_factory.rag_interface import RAGInterface
-from typing import List, Any, Dict
-import weaviate
-import os
-from dotenv import load_dotenv
+import threading
+from typing import List, Any, Dict, Optional, Tuple
 from src.rag.rag_factory.weviate.helpers.post_chunk import post_chunk
 from src.rag.rag_factory.weviate.helpers.get_all_chunks import get_chunks
 from src.rag.rag_factory.weviate.helpers.get_top_k_chunks import get_top_k_chunks
@@ -10,81 +8,136 @@ from src.rag.rag_factory.weviate.helpers.get_chunks_by_id import get_chunks_by_i
 from src.rag.rag_factory.weviate.helpers.get_collection_names import get_collection_names
 from src.rag.rag_factory.weviate.helpers.delete_chunks_by_id import delete_chunks_by_id
 from src.rag.rag_factory.weviate.helpers.get_number_of_chunks import get_chunks_count
-from abc import abstractmethod
+from src.rag.rag_factory.weviate.helpers.get_vectorizer_model import get_vectorizer_model
+from src.rag.rag_factory.weviate.pool import WeaviateClientPool
+from src.rag.rag_factory.weviate.aliases import AliasResolver
+from src.rag.rag_factory.collection_versions import bump_collection_version, get_collection_version
+from src.rag.rag_factory.retrieval_cache import RetrievalCache
+from src.rag.rag_factory.embeddings.embedding_service import EmbeddingService
 
 
 class WeviateDatabaseInistance(RAGInterface):
     
-    client = None
+    pool = None
     
-    def __init__(self):
+    def __init__(self, pool: WeaviateClientPool = None, retrieval_cache: RetrievalCache = None, embedding_service: EmbeddingService = None):
+        self.pool = pool
+        self.retrieval_cache = retrieval_cache if retrieval_cache is not None else RetrievalCache.from_env()
+        self.embedding_service = embedding_service
+        # collection names may be aliases of versioned collections built by a reindex
+        self.aliases = AliasResolver(on_switch=self._invalidate)
+        # (collection, version) -> embedding model the collection was vectorized with
+        self._vectorizer_models: Dict[Tuple[str, int], Optional[str]] = {}
+        self._vectorizer_lock = threading.Lock()
         self.connect()
     
-    def connect(self) -> None:        
-        load_dotenv()        
-        client = weaviate.connect_to_local(
-        host="weaviate",
-        port=8080,
-        grpc_port=50051,
-        headers={
-            "X-OpenAI-Api-Key": os.environ["OPENAI_API_KEY"]
-        })
-        if client is None:
-            raise Exception("Weaviate is not running")
-        else:
-            print("Weaviate is running")
-        self.client = client
+    def connect(self) -> None:
+        if self.pool is None:
+            self.pool = WeaviateClientPool()
+        if not self.pool.is_open:
+            self.pool.open()
+        print("Weaviate is running")
         return
     
     def disconnect(self) -> None:
         """Close database connection"""
-        self.client.close()
-        self.client = None
+        if self.pool is not None:
+            self.pool.close()
+        if self.embedding_service is not None:
+            self.embedding_service.close()
         print("Weaviate is closed")
         return
     
+    def is_healthy(self) -> bool:
+        """Check that weaviate is reachable"""
+        return self.pool is not None and self.pool.is_healthy()
+    
     def post_chunk(self, collection: str, data: List[Dict[str, str]]):
         """Post a document to the RAG"""
-        if self.client is None:
-            raise Exception("Weaviate is not running")
-        post_chunk(collection, data, self.client)
+        with self.pool.acquire() as client:
+            post_chunk(self.aliases.resolve(client, collection), data, client)
+        self._invalidate(collection)
         return
     
-    def get_top_k_chunks(self, collection: str, query: str, top_k: int, is_simple: bool = True, max_distance: float = 1.0) -> List[Dict[str, str]]:
+    def get_top_k_chunks(self, collection: str, query: str, top_k: int, is_simple: bool = True, max_distance: float = 1.0, vector: List[float] = None) -> List[Dict[str, str]]:
         """Get a response from the RAG"""
-        if self.client is None:
-            raise Exception("Weaviate is not running")
-        return get_top_k_chunks(collection, query, self.client, top_k, is_simple, max_distance)
+        if self.retrieval_cache is None:
+            return self._query_top_k_chunks(collection, query, top_k, is_simple, max_distance, vector)
+        
+        key = RetrievalCache.make_key(collection, query, top_k, max_distance, is_simple)
+        chunks = self.retrieval_cache.get(key)
+        if chunks is None:
+            chunks = self._query_top_k_chunks(collection, query, top_k, is_simple, max_distance, vector)
+            self.retrieval_cache.put(key, chunks)
+        return chunks
+    
+    def _query_top_k_chunks(self, collection: str, query: str, top_k: int, is_simple: bool, max_distance: float, vector: List[float] = None) -> List[Dict[str, str]]:
+        if vector is None and self.embedding_service is not None:
+            try:
+                vector = self.embedding_service.embed(query)
+            except Exception as e:
+                # fall back to weaviate side vectorization
+                print(f"Failed to embed query: {e}")
+        with self.pool.acquire() as client:
+            target = self.aliases.resolve(client, collection)
+            if vector is not None and not self._embedded_with_service_model(client, collection, target):
+                # a vector of another model ranks against the stored ones without any error, let weaviate embed the query
+                vector = None
+            return get_top_k_chunks(target, query, client, top_k, is_simple, max_distance, vector)
+
+    def _embedded_with_service_model(self, client, collection: str, target: str) -> bool:
+        """Whether `target` was vectorized with the model of the embedding service, so near_vector is safe"""
+        if self.embedding_service is None:
+            return False
+        key = (target, get_collection_version(collection))
+        with self._vectorizer_lock:
+            known = key in self._vectorizer_models
+            model = self._vectorizer_models.get(key)
+        if not known:
+            try:
+                model = get_vectorizer_model(target, client)
+            except Exception as e:
+                # not cached, asked again on the next query
+                print(f"Failed to read the vectorizer of {target}: {e}")
+                return False
+            with self._vectorizer_lock:
+                self._vectorizer_models[key] = model
+            if model != self.embedding_service.model:
+                print(f"Collection {target} is vectorized with {model or 'an unknown model'}, not {self.embedding_service.model}: "
+                      f"searching it with near_text until it is rebuilt with `run.py --mode reindex`")
+        return model == self.embedding_service.model
     
     def get_all_chunks(self, collection: str, limit: int = 10, page: int = 1) -> List[Dict[str, str]]:
         """Get all responses from the RAG"""
-        if self.client is None:
-            raise Exception("Weaviate is not running")
-        return get_chunks(collection, self.client, limit, page)
+        with self.pool.acquire() as client:
+            return get_chunks(self.aliases.resolve(client, collection), client, limit, page)
     
     def get_chunks_by_ids(self, collection: str, ids: List[str]) -> List[Dict[str, str]]:
         """Get a response from the RAG"""
-        if self.client is None:
-            raise Exception("Weaviate is not running")
-        return get_chunks_by_id(collection, ids, self.client)
+        with self.pool.acquire() as client:
+            return get_chunks_by_id(self.aliases.resolve(client, collection), ids, client)
     
     def get_collection_names(self) -> List[str]:
         """Get all table names from database"""
-        if self.client is None:
-            raise Exception("Weaviate is not running")
-        return get_collection_names(self.client)
+        with self.pool.acquire() as client:
+            return get_collection_names(client)
 
     def delete_chunks_by_id(self, collection: str, ids: List[str]) -> List[Any]:
         """Delete chunks by id"""
-        if self.client is None:
-            raise Exception("Weaviate is not running")
-        return delete_chunks_by_id(collection, ids, self.client)
+        with self.pool.acquire() as client:
+            deleted = delete_chunks_by_id(self.aliases.resolve(client, collection), ids, client)
+        self._invalidate(collection)
+        return deleted
     
     def get_number_of_chunks(self, collection: str) -> Any:
         """Get number of chunks"""
-        if self.client is None:
-            raise Exception("Weaviate is not running")
-        return get_chunks_count(collection, self.client)
+        with self.pool.acquire() as client:
+            return get_chunks_count(self.aliases.resolve(client, collection), client)
+        
+    def _invalidate(self, collection: str) -> None:
+        bump_collection_version(collection)
+        if self.retrieval_cache is not None:
+            self.retrieval_cache.invalidate(collection)
         
     def add_PDF(self, collection: str, data: List[Any]) -> List[Any]:
         """Post a document to the RAG"""
@@ -1,19 +1,34 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import os
+from fastapi import APIRouter, Depends, HTTPException, Request
 from src.rag.schemas import SimpleRagEntryRequest, SimpleRagEntryResponse
-from src.rag.rag_factory.weviate.weviate import WeviateDatabaseInistance
-from src.rag.rag_factory.weviate.seed.dbOps.run import run_seed
+from src.rag.rag_factory.rag_interface import RAGInterface
+from src.rag.rag_factory.weviate.seed.dbOps.run import run_seed, SEED_MODES
+from src.rag.rag_factory.weviate.seed.dbOps.reindex import rollback_collection, alias_status
+from src.rag.rag_factory.weviate.seed.dbOps.csv_poplator import get_data_rows
+from src.jobs.jobs import JobQueueFull
+from src.rag.rag_factory.inprocess.inprocess import InProcessVectorIndex
 
 router = APIRouter()
 
-async def get_db_insance():
-    db = WeviateDatabaseInistance()    
-    try:
-        yield db
-    finally:
-        db.disconnect()
+async def get_db_insance(request: Request) -> RAGInterface:
+    # shared pooled instance created in the app lifespan
+    return request.app.state.rag_db
+
+@router.get("/cache/stats")
+async def cache_stats(db: RAGInterface = Depends(get_db_insance)):
+    if getattr(db, "retrieval_cache", None) is None:
+        return {"enabled": False}
+    return {"enabled": True, **db.retrieval_cache.stats()}
+
+@router.get("/embeddings/stats")
+async def embedding_stats(db: RAGInterface = Depends(get_db_insance)):
+    if getattr(db, "embedding_service", None) is None:
+        return {"enabled": False}
+    return {"enabled": True, **db.embedding_service.stats()}
 
 @router.post("/entries", response_model=SimpleRagEntryResponse)
-async def query(request: SimpleRagEntryRequest, db: WeviateDatabaseInistance = Depends(get_db_insance)):
+async def query(request: SimpleRagEntryRequest, db: RAGInterface = Depends(get_db_insance)):
     
     entries = []
     for entry in request.entries:
@@ -31,7 +46,7 @@ async def query(request: SimpleRagEntryRequest, db: WeviateDatabaseInistance = D
     }
     
 @router.get("/entries/{collection_name}")
-async def query(collection_name: str, limit: int = 10, page: int = 1, db: WeviateDatabaseInistance = Depends(get_db_insance)):        
+async def query(collection_name: str, limit: int = 10, page: int = 1, db: RAGInterface = Depends(get_db_insance)):        
 
     entries = db.get_all_chunks(collection_name, limit, page)
         
@@ -41,7 +56,7 @@ async def query(collection_name: str, limit: int = 10, page: int = 1, db: Weviat
     }
 
 @router.get("/entries/count/{collection_name}")
-async def query(collection_name: str, db: WeviateDatabaseInistance = Depends(get_db_insance)):        
+async def query(collection_name: str, db: RAGInterface = Depends(get_db_insance)):        
 
     entries = db.get_number_of_chunks(collection_name)
     print(entries)
@@ -49,7 +64,7 @@ async def query(collection_name: str, db: WeviateDatabaseInistance = Depends(get
     return entries
 
 @router.get("/entries/{collection_name}/{id}")
-async def query(collection_name: str, id: str, db: WeviateDatabaseInistance = Depends(get_db_insance)):        
+async def query(collection_name: str, id: str, db: RAGInterface = Depends(get_db_insance)):        
 
     entries = db.get_chunks_by_ids(collection_name, [id])
         
@@ -59,7 +74,7 @@ async def query(collection_name: str, id: str, db: WeviateDatabaseInistance = De
     }
 
 @router.delete("/entries/{collection_name}/{id}")
-async def query(collection_name: str, id: str, db: WeviateDatabaseInistance = Depends(get_db_insance)):        
+async def query(collection_name: str, id: str, db: RAGInterface = Depends(get_db_insance)):        
 
     db.delete_chunks_by_id(collection_name, [id])
         
@@ -68,7 +83,7 @@ async def query(collection_name: str, id: str, db: WeviateDatabaseInistance = De
     }
 
 @router.get("/collections")
-async def query(db: WeviateDatabaseInistance = Depends(get_db_insance)):        
+async def query(db: RAGInterface = Depends(get_db_insance)):        
 
     entries = db.get_collection_names()
         
@@ -78,7 +93,7 @@ async def query(db: WeviateDatabaseInistance = Depends(get_db_insance)):
     }
 
 @router.get("/query/{collection_name}/{query}")
-async def query(collection_name: str, query: str, topk: int = 3, db: WeviateDatabaseInistance = Depends(get_db_insance)):
+async def query(collection_name: str, query: str, topk: int = 3, db: RAGInterface = Depends(get_db_insance)):
 
     entries = db.get_top_k_chunks(collection_name, query, topk, False)
         
@@ -87,10 +102,52 @@ async def query(collection_name: str, query: str, topk: int = 3, db: WeviateData
         "entries": entries
     }
     
-@router.get("/seed")
-async def seed(file_path: str, collection_name: str = "PIHR_DATASET", db: WeviateDatabaseInistance = Depends(get_db_insance)):        
-    run_seed(file_path=file_path, collection_name=collection_name)
-        
+def seed_job(db: RAGInterface, file_path: str, collection_name: str, mode: str = None):
+    """The "seed" job, run by the JobRunner; an IngestError keeps the checkpoint and fails the job with its report"""
+    if isinstance(db, InProcessVectorIndex):
+        return {"target": collection_name, "indexed": db.replace_collection(collection_name, get_data_rows(file_path))}
+    result = run_seed(file_path=file_path, collection_name=collection_name, mode=mode)
+    # this worker reads the new version right away, the others within WEAVIATE_ALIAS_TTL_SECONDS
+    db.aliases.forget(collection_name)
+    return result
+
+# mode=incremental (default) applies the changed rows, mode=reindex builds a new version and switches the alias,
+# mode=replace rebuilds in place
+# the seed runs as a background job, follow it with GET /api/v1/jobs/{job_id}
+@router.get("/seed", status_code=202)
+async def seed(request: Request, file_path: str, collection_name: str = "PIHR_DATASET", mode: str = None):
+    if mode is not None and mode.lower() not in SEED_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown seed mode: {mode}, expected one of {', '.join(SEED_MODES)}")
+    if not os.path.isfile(file_path):
+        raise HTTPException(status_code=400, detail=f"{file_path} not found")
+    try:
+        job = request.app.state.jobs.submit("seed", file_path=file_path, collection_name=collection_name, mode=mode)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    return {
+        "message": f"Seeding RAG from {file_path}",
+        "job_id": job["id"],
+        "status": job["status"],
+    }
+
+@router.get("/aliases/{collection_name}")
+async def get_alias(collection_name: str, db: RAGInterface = Depends(get_db_insance)):
+    if isinstance(db, InProcessVectorIndex):
+        raise HTTPException(status_code=400, detail="Collection aliases need the weaviate backend")
+    return await asyncio.to_thread(alias_status, collection_name)
+
+@router.post("/aliases/{collection_name}/rollback")
+async def rollback_alias(collection_name: str, db: RAGInterface = Depends(get_db_insance)):
+    if isinstance(db, InProcessVectorIndex):
+        raise HTTPException(status_code=400, detail="Collection aliases need the weaviate backend")
+    try:
+        # reads and rewrites the alias pointer in weaviate, blocking
+        pointer = await asyncio.to_thread(rollback_collection, collection_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db.aliases.forget(collection_name)
     return {
-        "message": f"Successfully Seeded RAG from {file_path}",
+        "message": f"{collection_name} rolled back to {pointer['target']}",
+        "alias": pointer,
     }
\ No newline at end of file
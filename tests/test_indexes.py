@@ -0,0 +1,41 @@
+"""
+Checks that no hot query of mongo.py scans a whole collection.
+
+Needs a MongoDB server, skipped unless MONGO_URI is set. Runs against a throwaway
+database dropped afterwards.
+
+Usage:
+    MONGO_URI=mongodb://localhost:27017 python -m pytest tests/test_indexes.py
+"""
+import os
+import unittest
+import uuid
+
+from src.db.db_factory.mongo.indexes import INDEXES, ensure_indexes, verify_indexes
+
+MONGO_URI = os.getenv("MONGO_URI")
+
+
+@unittest.skipUnless(MONGO_URI, "MONGO_URI is not set")
+class HotQueryIndexesTest(unittest.TestCase):
+
+    def setUp(self):
+        from pymongo import MongoClient
+
+        self.client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+        self.db = self.client[f"index_test_{uuid.uuid4().hex[:8]}"]
+        # the plan of a query on a collection that does not exist is EOF, not COLLSCAN
+        for collection_name in INDEXES:
+            self.db[collection_name].insert_one({"_id": collection_name})
+
+    def tearDown(self):
+        self.client.drop_database(self.db.name)
+        self.client.close()
+
+    def test_no_hot_query_scans_a_collection(self):
+        ensure_indexes(self.db)
+        self.assertEqual(verify_indexes(self.db), [])
+
+
+if __name__ == "__main__":
+    unittest.main()